@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenWeatherMap API, used by the benchmarks.
+
+Serves the recorded `weather` and `forecast` payloads in `fixtures/` with the
+requested city name filled in, and can inject latency, 5xx errors and 429
+rate-limit responses. Point the app at it with WEATHER_BASE_URL (or
+Config.BASE_URL).
+
+Usage:
+    python benchmarks/fake_server.py --port 8765 --latency 0.05 --error-rate 0.01
+    WEATHER_BASE_URL=http://127.0.0.1:8765 OPENWEATHER_API_KEY=x python weather.py London
+
+Cities whose name starts with "nowhere" answer 404. Each city name gets a
+stable city ID, and queries by `id` answer for the city that ID was handed
+out for.
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+class FakeOpenWeatherMap:
+    """Threaded fake OpenWeatherMap server with fault injection."""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: int = 1, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.payloads = {
+            'weather': json.loads((FIXTURES / 'weather.json').read_text()),
+            'forecast': json.loads((FIXTURES / 'forecast.json').read_text())
+        }
+        self.counts = {}
+        self.names = {}  # City ID -> name
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+    
+    @property
+    def base_url(self) -> str:
+        """Base URL to use as Config.BASE_URL."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+    
+    def reset_counts(self):
+        """Forget request counters."""
+        with self._lock:
+            self.counts = {}
+    
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self.random.random() < rate
+    
+    def _delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+    
+    def respond(self, path: str, query: dict):
+        """Return (status, headers, body) for a request."""
+        endpoint = path.rstrip('/').rsplit('/', 1)[-1]
+        self._count('requests')
+        
+        if endpoint not in self.payloads and endpoint != 'group':
+            self._count('404')
+            return 404, {}, {'cod': '404', 'message': 'Internal error'}
+        
+        if self._roll(self.rate_limit_rate):
+            self._count('429')
+            return 429, {'Retry-After': str(self.retry_after)}, {'cod': 429, 'message': 'Too many requests'}
+        
+        if self._roll(self.error_rate):
+            self._count('500')
+            return 500, {}, {'cod': '500', 'message': 'Internal server error'}
+        
+        if endpoint == 'group':
+            self._count('200')
+            return 200, {}, self._group(query.get('id', ''))
+        
+        if 'id' in query:
+            city_id = int(query['id'])
+            with self._lock:
+                city = self.names.get(city_id, f"City {city_id}")
+        else:
+            city = query.get('q', 'London').split(',')[0].strip().title()
+            city_id = zlib.crc32(city.lower().encode('utf-8')) & 0x7fffffff
+            with self._lock:
+                self.names[city_id] = city
+        if city.lower().startswith('nowhere'):
+            self._count('404')
+            return 404, {}, {'cod': '404', 'message': 'city not found'}
+        
+        payload = dict(self.payloads[endpoint])
+        if endpoint == 'weather':
+            payload.update(name=city, id=city_id)
+        else:
+            payload['city'] = dict(payload['city'], name=city, id=city_id)
+            if 'cnt' in query:
+                payload['list'] = payload['list'][:int(query['cnt'])]
+                payload['cnt'] = len(payload['list'])
+        
+        self._count('200')
+        return 200, {}, payload
+    
+    def _group(self, ids: str) -> dict:
+        """`group` payload for comma-separated IDs; unknown "nowhere" cities are left out."""
+        items = []
+        for city_id in filter(None, ids.split(',')):
+            with self._lock:
+                city = self.names.get(int(city_id), f"City {city_id}")
+            if not city.lower().startswith('nowhere'):
+                items.append(dict(self.payloads['weather'], name=city, id=int(city_id)))
+        return {'cnt': len(items), 'list': items}
+    
+    def _handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+            disable_nagle_algorithm = True  # Headers and body are separate writes
+            
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                delay = server._delay()
+                if delay:
+                    time.sleep(delay)
+                
+                status, headers, payload = server.respond(url.path, query)
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    # Compressed like the real API
+                    body = gzip.compress(body, 6)
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def start(self) -> 'FakeOpenWeatherMap':
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- seconds around --latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 500 responses')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of 429 responses')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429')
+    options = parser.parse_args()
+    
+    server = FakeOpenWeatherMap(options.host, options.port, options.latency, options.jitter,
+                                options.error_rate, options.rate_limit_rate, options.retry_after)
+    print(f"Serving fake OpenWeatherMap on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the weather app.
+
+Runs every scenario against a local fake OpenWeatherMap server (see
+fake_server.py), never the live API:
+
+- api:     end-to-end WeatherAPI latency percentiles and throughput on cache misses
+- batch:   concurrent multi-city fetches with injected errors and 429s
+- outage:  multi-city sweep while every request fails, with and without last-known data
+- group:   current weather for many city IDs, with and without `group` calls
+- async:   many concurrent lookups through AsyncWeatherAPI versus WeatherAPI's thread pool
+- cli:     full `weather.py` invocations, cache miss and cache hit
+- cache:   get (hit/miss) and set cost and disk footprint per WeatherCache backend
+- codec:   cache entry encode/decode time and size, compact and compressed
+- display: WeatherDisplay rendering time
+- history: observation history appends and range queries over many cities
+
+Results are written as JSON so runs can be compared for regressions.
+
+Usage:
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --only api,cache --latency 0.02
+    python benchmarks/run.py --output new.json --compare results.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+sys.path.insert(0, str(ROOT))
+
+from fake_server import FakeOpenWeatherMap
+from weather_app.config import Config
+from weather_app.metrics import metrics
+from weather_app.models import CurrentObservation, ForecastSeries
+
+SCENARIOS = ('api', 'batch', 'outage', 'group', 'async', 'cli', 'cache', 'codec', 'display', 'history')
+
+def percentiles(samples_ms):
+    """Latency summary in milliseconds."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {'count': 0}
+    
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+    
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': pick(0.50),
+        'p90_ms': pick(0.90),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1], 3)
+    }
+
+def timed(fn, *args, **kwargs):
+    """Call fn and return (elapsed ms, result)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+def configure(base_url: str, cache_dir: Path, backend: str = 'file'):
+    """Point Config at the fake server and a scratch cache."""
+    Config.API_KEY = 'benchmark'
+    Config.BASE_URL = base_url
+    Config.CACHE_DIR = cache_dir
+    Config.CACHE_BACKEND = backend
+    Config.BACKOFF_BASE = 0.01
+    Config.BACKOFF_MAX = 0.05
+    Config.RATE_LIMIT = 0  # Measure the client, not the client-side throttle
+    Config.CITY_INDEX = cache_dir / 'cities.idx'
+    Config.HISTORY_DIR = cache_dir / 'history'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+def bench_api(server, tmp: Path, options):
+    """Sequential cache-miss latency through WeatherAPI."""
+    from weather_app.api import WeatherAPI
+    
+    results = {}
+    for endpoint in ('current', 'forecast'):
+        configure(server.base_url, tmp / f'api-{endpoint}')
+        api = WeatherAPI()
+        fetch = api.get_current_weather if endpoint == 'current' else api.get_forecast
+        fetch('Warmup City')  # Open the pooled connection
+        
+        server.reset_counts()
+        metrics.reset()
+        samples = []
+        start = time.perf_counter()
+        for i in range(options.requests):
+            elapsed, _ = timed(fetch, f"City {i}")
+            samples.append(elapsed)
+        wall = time.perf_counter() - start
+        
+        counters = metrics.snapshot()['counters']
+        results[endpoint] = dict(percentiles(samples),
+                                 throughput_rps=round(len(samples) / wall, 2),
+                                 body_bytes=counters.get('http.bytes_received', 0),
+                                 wire_bytes=counters.get('http.bytes_wire', 0),
+                                 upstream=dict(server.counts))
+        api.close()
+    return results
+
+def bench_batch(server, tmp: Path, options):
+    """Concurrent multi-city fetches with fault injection."""
+    from weather_app.api import WeatherAPI
+    
+    configure(server.base_url, tmp / 'batch')
+    server.error_rate, server.rate_limit_rate = options.error_rate, options.rate_limit_rate
+    server.retry_after = 0
+    api = WeatherAPI()
+    cities = [f"Batch City {i}" for i in range(options.requests)]
+    
+    server.reset_counts()
+    elapsed, results = timed(api.get_current_weather_many, cities, max_workers=options.concurrency)
+    failures = sum(1 for _, _, error in results if error is not None)
+    server.error_rate = server.rate_limit_rate = 0.0
+    api.close()
+    
+    return {
+        'cities': len(cities),
+        'concurrency': options.concurrency,
+        'wall_ms': round(elapsed, 3),
+        'throughput_rps': round(len(cities) / (elapsed / 1000), 2),
+        'failures': failures,
+        'upstream': dict(server.counts)
+    }
+
+def bench_outage(server, tmp: Path, options):
+    """Sweep while the service answers only 5xx, for cities with expired entries and for unseen cities."""
+    from weather_app.api import WeatherAPI
+    
+    configure(server.base_url, tmp / 'outage')
+    cities = [f"Outage City {i}" for i in range(options.requests)]
+    api = WeatherAPI()
+    api.get_current_weather_many(cities, max_workers=options.concurrency)
+    # Age entries past their stale window so only the last-known copy can answer
+    for city in cities:
+        key = api.cache_key('current', city)
+        entry = api.cache._load(key)
+        entry['expires'] -= 3600
+        entry['stored'] -= 3600
+        api.cache._store(key, entry)
+    api.close()
+    
+    results = {}
+    server.error_rate = 1.0
+    for mode, names in (('fallback', cities), ('cold', [f"Unseen City {i}" for i in range(options.requests)])):
+        api = WeatherAPI()
+        server.reset_counts()
+        elapsed, batch = timed(api.get_current_weather_many, names, max_workers=options.concurrency)
+        api.close()
+        results[mode] = {
+            'cities': len(names),
+            'wall_ms': round(elapsed, 3),
+            'served_stale': sum(1 for _, value, _ in batch if value is not None and value.stale_age is not None),
+            'failures': sum(1 for _, _, error in batch if error is not None),
+            'upstream': dict(server.counts)
+        }
+    server.error_rate = 0.0
+    return results
+
+def bench_group(server, tmp: Path, options):
+    """Sweep of city IDs fetched one per call versus batched into `group` calls."""
+    from weather_app.api import WeatherAPI
+    
+    cities = [str(9000000 + i) for i in range(options.group_cities)]
+    results = {}
+    for mode, group_size in (('single', 0), ('grouped', 20)):
+        configure(server.base_url, tmp / f'group-{mode}')
+        Config.GROUP_SIZE = group_size
+        api = WeatherAPI()
+        
+        server.reset_counts()
+        elapsed, batch = timed(api.get_current_weather_many, cities, max_workers=options.concurrency)
+        api.close()
+        results[mode] = {
+            'cities': len(cities),
+            'wall_ms': round(elapsed, 3),
+            'failures': sum(1 for _, _, error in batch if error is not None),
+            'upstream': dict(server.counts)
+        }
+    return results
+
+def bench_async(server, tmp: Path, options):
+    """Cities by name looked up all at once with AsyncWeatherAPI, against WeatherAPI with --concurrency threads."""
+    import asyncio
+    import threading
+    from weather_app.api import WeatherAPI
+    from weather_app.async_api import AsyncWeatherAPI
+    
+    cities = [f"Async City {i}" for i in range(options.async_cities)]
+    
+    def summary(elapsed, batch, threads):
+        return {
+            'cities': len(cities),
+            'wall_ms': round(elapsed, 3),
+            'failures': sum(1 for _, _, error in batch if error is not None),
+            'threads': threads,
+            'upstream': dict(server.counts)
+        }
+    
+    configure(server.base_url, tmp / 'async-sync')
+    api = WeatherAPI()
+    results = {}
+    for state in ('miss', 'hit'):
+        server.reset_counts()
+        elapsed, batch = timed(api.get_current_weather_many, cities, max_workers=options.concurrency)
+        results[f'sync_{state}'] = summary(elapsed, batch, options.concurrency)
+    api.close()
+    
+    def client_threads():
+        # The fake server runs in this process too
+        return sum(1 for thread in threading.enumerate() if 'process_request' not in thread.name)
+    
+    async def run_async():
+        peak = client_threads()
+        
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, client_threads())
+                await asyncio.sleep(0.005)
+        
+        configure(server.base_url, tmp / 'async-async')
+        async with AsyncWeatherAPI() as api:
+            watcher = asyncio.ensure_future(watch())
+            for state in ('miss', 'hit'):
+                server.reset_counts()
+                start = time.perf_counter()
+                batch = await api.get_current_weather_many(cities)
+                elapsed = (time.perf_counter() - start) * 1000
+                results[f'async_{state}'] = summary(elapsed, batch, peak - baseline)
+            watcher.cancel()
+    
+    baseline = client_threads()
+    asyncio.run(run_async())
+    return results
+
+def bench_cli(server, tmp: Path, options):
+    """Full CLI invocations: first call misses the cache, later calls hit it."""
+    env = dict(os.environ,
+               OPENWEATHER_API_KEY='benchmark',
+               WEATHER_BASE_URL=server.base_url,
+               WEATHER_CACHE_DIR=str(tmp / 'cli-cache'),
+               COLUMNS='100')
+    command = [sys.executable, str(ROOT / 'weather.py')]
+    
+    def invoke(args):
+        return timed(subprocess.run, command + args, env=env, cwd=ROOT,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)[0]
+    
+    miss, hit = [], []
+    for i in range(options.cli_runs):
+        city = f"Cli City {i}"
+        miss.append(invoke([city]))
+        hit.append(invoke([city]))
+    return {'miss': percentiles(miss), 'hit': percentiles(hit)}
+
+def bench_cache(server, tmp: Path, options):
+    """get/set cost per cache backend, alone and behind the in-memory tier."""
+    from weather_app.cache import create_cache
+    
+    payload = ForecastSeries.from_api(json.loads((FIXTURES / 'forecast.json').read_text())).to_cache()
+    keys = [f"forecast_bench city {i}" for i in range(options.cache_entries)]
+    memory_entries = Config.MEMORY_CACHE_ENTRIES
+    results = {}
+    for name in ('file', 'sqlite', 'file+memory', 'sqlite+memory'):
+        backend, _, memory = name.partition('+')
+        configure(server.base_url, tmp / f'cache-{backend}-{memory}', backend)
+        Config.MEMORY_CACHE_ENTRIES = options.cache_entries if memory else 0
+        cache = create_cache()
+        set_ms = [timed(cache.set, key, payload)[0] for key in keys]
+        disk = cache.disk_usage()
+        hit_ms = [timed(cache.get, key)[0] for key in keys]
+        miss_ms = [timed(cache.get, f"{key} missing")[0] for key in keys]
+        clear_ms, _ = timed(cache.clear)
+        results[name] = {
+            'set': percentiles(set_ms),
+            'get_hit': percentiles(hit_ms),
+            'get_miss': percentiles(miss_ms),
+            'clear_ms': round(clear_ms, 3),
+            'disk_bytes': disk[1] if disk else None
+        }
+    Config.MEMORY_CACHE_ENTRIES = memory_entries
+    return results
+
+def bench_codec(server, tmp: Path, options):
+    """Encode/decode time and stored size of cache entries, against the old indented stdlib JSON."""
+    from weather_app import codec
+    
+    payloads = {
+        'current': CurrentObservation.from_api(json.loads((FIXTURES / 'weather.json').read_text())).to_cache(),
+        'forecast': ForecastSeries.from_api(json.loads((FIXTURES / 'forecast.json').read_text())).to_cache()
+    }
+    results = {'library': codec.NAME}
+    for name, payload in payloads.items():
+        entry = {'expires': time.time(), 'data': payload}
+        indented = json.dumps(entry, indent=2)
+        stored = codec.encode_entry(entry)
+        results[name] = {
+            'indented_bytes': len(indented),
+            'compact_bytes': len(codec.dumps(entry)),
+            'stored_bytes': len(stored),
+            'encode': percentiles([timed(codec.encode_entry, entry)[0] for _ in range(options.codec_runs)]),
+            'decode': percentiles([timed(codec.decode_entry, stored)[0] for _ in range(options.codec_runs)]),
+            'stdlib_encode': percentiles([timed(json.dumps, entry, indent=2)[0] for _ in range(options.codec_runs)]),
+            'stdlib_decode': percentiles([timed(json.loads, indented)[0] for _ in range(options.codec_runs)])
+        }
+    return results
+
+def bench_display(server, tmp: Path, options):
+    """Rendering cost of WeatherDisplay into an in-memory console."""
+    from rich.console import Console
+    from weather_app.display import WeatherDisplay
+    
+    current = CurrentObservation.from_api(json.loads((FIXTURES / 'weather.json').read_text()))
+    forecast = ForecastSeries.from_api(json.loads((FIXTURES / 'forecast.json').read_text()))
+    display = WeatherDisplay()
+    
+    def render(method, *args):
+        display.console = Console(file=io.StringIO(), width=100, force_terminal=True)
+        return timed(method, *args)[0]
+    
+    return {
+        'current': percentiles([render(display.display_current_weather, current, 'metric')
+                                for _ in range(options.render_runs)]),
+        'forecast': percentiles([render(display.display_forecast, forecast, 5, 'metric')
+                                 for _ in range(options.render_runs)])
+    }
+
+def bench_history(server, tmp: Path, options):
+    """Hourly observations for many cities appended to the history store, then queried by range."""
+    from weather_app.history import HistoryStore
+    
+    configure(server.base_url, tmp / 'history')
+    store = HistoryStore(retention_days=options.history_days + 1)
+    observation = CurrentObservation.from_api(json.loads((FIXTURES / 'weather.json').read_text()))
+    now = int(time.time())
+    start = now - options.history_days * 86400
+    keys = [f"#{9000000 + i}" for i in range(options.history_cities)]
+    
+    append_ms = []
+    for dt in range(start, now, 3600):
+        observation.dt = dt
+        observation.temp = 10 + (dt // 3600) % 24 / 2
+        for key in keys:
+            append_ms.append(timed(store.append, key, observation, now=dt)[0])
+    
+    week_ms = [timed(store.observations, key, now - 7 * 86400)[0] for key in keys]
+    full_ms = [timed(store.observations, key, start)[0] for key in keys]
+    return {
+        'cities': len(keys),
+        'observations_per_city': len(append_ms) // len(keys),
+        'bytes': sum(path.stat().st_size for path in store.path.iterdir()),
+        'append': percentiles(append_ms),
+        'query_7d': percentiles(week_ms),
+        'query_all': percentiles(full_ms)
+    }
+
+def git_revision():
+    """Current git commit, if available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def flatten(data, prefix=''):
+    """Flatten nested results into {'a.b.c': number}."""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(current, baseline_path: str):
+    """Print relative change of every *_ms metric against a previous results file."""
+    baseline = flatten(json.loads(Path(baseline_path).read_text())['results'])
+    print(f"\nComparison with {baseline_path} (+ is slower):")
+    for name, value in sorted(flatten(current).items()):
+        if not name.endswith('_ms') or not baseline.get(name):
+            continue
+        change = (value - baseline[name]) / baseline[name] * 100
+        print(f"  {name:<45} {baseline[name]:>10.3f} -> {value:>10.3f}  ({change:+6.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--output', metavar='FILE', help='Write JSON results to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with a previous results file')
+    parser.add_argument('--requests', type=int, default=100, help='API requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='Workers for the batch scenario')
+    parser.add_argument('--group-cities', type=int, default=300, help='City IDs in the group scenario')
+    parser.add_argument('--async-cities', type=int, default=500, help='Cities in the async scenario')
+    parser.add_argument('--cli-runs', type=int, default=10, help='CLI invocations per cache state')
+    parser.add_argument('--cache-entries', type=int, default=500, help='Entries per cache backend')
+    parser.add_argument('--render-runs', type=int, default=50, help='Renders per display method')
+    parser.add_argument('--codec-runs', type=int, default=1000, help='Encodes/decodes per payload')
+    parser.add_argument('--history-cities', type=int, default=50, help='Cities in the history scenario')
+    parser.add_argument('--history-days', type=int, default=90, help='Days of hourly observations per city')
+    parser.add_argument('--latency', type=float, default=0.02, help='Fake server latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.005, help='Fake server latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='500 rate in the batch scenario')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.02, help='429 rate in the batch scenario')
+    options = parser.parse_args()
+    
+    selected = options.only.split(',') if options.only else list(SCENARIOS)
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    
+    results = {}
+    tmp = Path(tempfile.mkdtemp(prefix='weather-bench-'))
+    try:
+        with FakeOpenWeatherMap(latency=options.latency, jitter=options.jitter, seed=42) as server:
+            for name in selected:
+                print(f"Running {name}...", file=sys.stderr)
+                results[name] = globals()[f"bench_{name}"](server, tmp, options)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    
+    report = {
+        'benchmark': 'weather-app',
+        'timestamp': time.time(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': vars(options),
+        'results': results
+    }
+    print(json.dumps(results, indent=2))
+    
+    if options.output:
+        Path(options.output).write_text(json.dumps(report, indent=2))
+    if options.compare:
+        compare(results, options.compare)
+
+if __name__ == '__main__':
+    main()
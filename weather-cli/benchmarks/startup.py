@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the weather CLI.
+
+Measures wall-clock latency of full `weather.py` invocations answered from a
+pre-seeded cache, so no network is involved:
+
+- cold: every run uses a fresh copy of the app, so it is compiled from scratch
+- warm: the app's bytecode is already cached, as on a normal repeated invocation
+
+It also reports whether `requests` gets imported on the cache-hit path.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 30 --json startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+CITY = 'London'
+sys.path.insert(0, str(ROOT))
+
+from weather_app.models import CurrentObservation, ForecastSeries
+
+def seed_cache(cache_dir: Path):
+    """Write fresh file-cache entries for CITY from the recorded payloads."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for kind, fixture, model in (('current', 'weather.json', CurrentObservation),
+                                 ('forecast', 'forecast.json', ForecastSeries)):
+        entry = {
+            'expires': time.time() + 3600,  # Stays fresh for the whole run
+            'data': model.from_api(json.loads((FIXTURES / fixture).read_text())).to_cache()
+        }
+        (cache_dir / f"{kind}_{CITY.lower()}.json").write_text(json.dumps(entry))
+
+def copy_app(target: Path) -> Path:
+    """Copy the entry point and package (without bytecode) to target."""
+    target.mkdir(parents=True)
+    shutil.copy(ROOT / 'weather.py', target)
+    shutil.copytree(ROOT / 'weather_app', target / 'weather_app',
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    return target
+
+def run_once(app: Path, args, env) -> float:
+    """Run the CLI once and return its wall time in milliseconds."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(app / 'weather.py')] + args, env=env, cwd=app,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+def summarize(samples):
+    """Summary statistics in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 2),
+        'median_ms': round(statistics.median(ordered), 2),
+        'p90_ms': round(ordered[int(0.9 * (len(ordered) - 1))], 2),
+        'max_ms': round(ordered[-1], 2)
+    }
+
+def imports_requests(app: Path, args, env) -> bool:
+    """Check whether a cache-hit invocation imports `requests`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', str(app / 'weather.py')] + args,
+                            env=env, cwd=app, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True, check=True)
+    return any(line.rstrip().endswith('| requests') for line in result.stderr.splitlines())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=15, help='Invocations per scenario')
+    parser.add_argument('--json', metavar='FILE', help='Also write results as JSON to FILE')
+    options = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        seed_cache(tmp / 'cache')
+        env = dict(os.environ,
+                   OPENWEATHER_API_KEY=os.environ.get('OPENWEATHER_API_KEY', 'benchmark'),
+                   WEATHER_CACHE_DIR=str(tmp / 'cache'),
+                   WEATHER_CACHE_BACKEND='file',
+                   WEATHER_BASE_URL='http://127.0.0.1:9',  # Any network use fails loudly
+                   COLUMNS='100')
+        
+        warm_app = copy_app(tmp / 'app-warm')
+        results = {}
+        for name, args in (('current', [CITY]), ('forecast', [CITY, '--forecast', '5'])):
+            cold = [run_once(copy_app(tmp / f'app-cold-{name}-{i}'), args, env)
+                    for i in range(options.runs)]
+            
+            run_once(warm_app, args, env)  # Populate bytecode cache
+            warm = [run_once(warm_app, args, env) for _ in range(options.runs)]
+            
+            results[name] = {
+                'cold': summarize(cold),
+                'warm': summarize(warm),
+                'imports_requests': imports_requests(warm_app, args, env)
+            }
+    
+    for name, result in results.items():
+        print(f"{name}:")
+        for phase in ('cold', 'warm'):
+            stats = result[phase]
+            print(f"  {phase:<5} median {stats['median_ms']:8.2f} ms   "
+                  f"p90 {stats['p90_ms']:8.2f} ms   min {stats['min_ms']:8.2f} ms")
+        print(f"  imports requests on cache hit: {result['imports_requests']}")
+    
+    if options.json:
+        Path(options.json).write_text(json.dumps({
+            'benchmark': 'startup',
+            'python': sys.version.split()[0],
+            'results': results
+        }, indent=2))
+
+if __name__ == '__main__':
+    main()
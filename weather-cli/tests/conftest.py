@@ -0,0 +1,80 @@
+"""Shared fixtures: a WeatherAPI isolated from the user's cache, index and history."""
+import sys
+from pathlib import Path
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_app.config import Config
+
+class FakeResponse:
+    """Just enough of requests.Response for WeatherAPI."""
+    
+    def __init__(self, body: bytes = b'{}', status_code: int = 200, error: Exception = None):
+        self._body = body
+        self._error = error
+        self.status_code = status_code
+        self.headers = {}
+        self.raw = None
+    
+    @property
+    def content(self) -> bytes:
+        if self._error is not None:
+            raise self._error
+        return self._body
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}", response=self)
+
+class FakeSession:
+    """Session answering each get() with the next scripted response or exception.
+    
+    An outcome may also be a function of (url, params) returning the response.
+    """
+    
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+    
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        outcome = self.outcomes.pop(0)
+        if callable(outcome):
+            outcome = outcome(url, params)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+    
+    def close(self):
+        pass
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Point Config at a scratch directory, with no throttling, retries, grouping or history."""
+    settings = {
+        'API_KEY': 'test',
+        'BASE_URL': 'http://weather.invalid',
+        'CACHE_DIR': tmp_path,
+        'CITY_INDEX': tmp_path / 'cities.idx',
+        'HISTORY_DIR': tmp_path / 'history',
+        'HISTORY': False,
+        'RATE_LIMIT': 0,
+        'MAX_RETRIES': 0,
+        'GROUP_SIZE': 0,
+        'OFFLINE': False,
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(Config, name, value)
+    return Config
+
+@pytest.fixture
+def api(config):
+    """WeatherAPI on an in-memory cache."""
+    from weather_app.api import WeatherAPI
+    from weather_app.cache import MemoryCache
+    
+    client = WeatherAPI(cache=MemoryCache())
+    yield client
+    client.close()
@@ -0,0 +1,46 @@
+"""WeatherAPI request handling."""
+import time
+import pytest
+import requests
+from conftest import FakeResponse, FakeSession
+from weather_app.errors import CircuitOpenError, ServiceUnavailableError, WeatherAPIError
+from weather_app.resilience import CircuitBreaker
+
+def test_failed_body_read_ends_recovery_check(api):
+    """A body that can't be read during the half-open trial must not leave the breaker stuck."""
+    api.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    api._session = FakeSession(
+        requests.exceptions.ConnectionError("connection refused"),
+        FakeResponse(error=requests.exceptions.ContentDecodingError("bad gzip")),
+        FakeResponse(b'{"ok": true}'),
+    )
+    
+    with pytest.raises(ServiceUnavailableError):
+        api._request_with_retries('weather', {'q': 'London'})
+    assert api.breaker.state == CircuitBreaker.OPEN
+    
+    time.sleep(0.15)
+    with pytest.raises(WeatherAPIError) as failed:
+        api._request_with_retries('weather', {'q': 'London'})
+    assert not isinstance(failed.value, CircuitOpenError)
+    assert api.breaker.state == CircuitBreaker.OPEN  # The trial failed; wait again
+    
+    time.sleep(0.15)
+    assert api._request_with_retries('weather', {'q': 'London'}) == {'ok': True}
+    assert api.breaker.state == CircuitBreaker.CLOSED
+
+def test_interrupted_trial_is_released(api):
+    """A trial call interrupted before the service answered frees the breaker for the next one."""
+    api.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    api._session = FakeSession(
+        requests.exceptions.ConnectionError("connection refused"),
+        KeyboardInterrupt(),
+        FakeResponse(b'{"ok": true}'),
+    )
+    
+    with pytest.raises(ServiceUnavailableError):
+        api._request_with_retries('weather', {'q': 'London'})
+    time.sleep(0.1)
+    with pytest.raises(KeyboardInterrupt):
+        api._request_with_retries('weather', {'q': 'London'})
+    assert api._request_with_retries('weather', {'q': 'London'}) == {'ok': True}
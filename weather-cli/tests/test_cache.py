@@ -0,0 +1,22 @@
+"""Cache backends."""
+from weather_app.cache import MemoryCache
+
+def test_memory_cache_drops_least_recently_used_entries(config):
+    cache = MemoryCache(max_entries=2)
+    cache.set('current_a', {'temp': 1})
+    cache.set('current_b', {'temp': 2})
+    assert cache.get('current_a') == {'temp': 1}  # Now the most recently used
+    cache.set('current_c', {'temp': 3})
+    
+    assert cache.get('current_b') is None
+    assert cache.get('current_a') == {'temp': 1}
+    assert cache.memory_usage()[0] == 2
+
+def test_memory_cache_byte_limit(config):
+    cache = MemoryCache(max_bytes=200)
+    for i in range(20):
+        cache.set(f'current_{i}', {'name': 'x' * 40})
+    entries, size = cache.memory_usage()
+    assert 0 < entries < 20
+    assert size <= 200
+    assert cache.get('current_19') is not None
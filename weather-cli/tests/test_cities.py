@@ -0,0 +1,20 @@
+"""City name normalization and resolution."""
+import pytest
+from weather_app.cities import normalize_city
+
+@pytest.mark.parametrize('typed, key', [
+    ("  New York, US", "new york,us"),
+    ("São Paulo , BR", "sao paulo,br"),
+    ("Zürich", "zurich"),
+    ("दिल्ली", "दिल्ली"),
+    ("ちば", "ちば"),
+    ("Йошкар-Ола", "йошкар-ола"),
+])
+def test_normalize_city_folds_only_latin_accents(typed, key):
+    assert normalize_city(typed) == key
+
+def test_unknown_city_is_queried_as_typed(api):
+    """The folded name is only a cache key; the API gets the user's spelling."""
+    assert api.resolve_city("  दिल्ली ") == ("दिल्ली", {'q': "दिल्ली"})
+    assert api.resolve_city("Йошкар-Ола,  RU") == ("йошкар-ола,ru", {'q': "Йошкар-Ола,RU"})
+    assert api.resolve_city("São Paulo")[0] == api.resolve_city("sao paulo")[0]
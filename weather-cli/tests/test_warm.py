@@ -0,0 +1,32 @@
+"""Cache warming."""
+import json
+from pathlib import Path
+from conftest import FakeResponse, FakeSession
+from weather_app.api import WeatherAPI
+from weather_app.cache import MemoryCache
+from weather_app.warm import CacheWarmer
+
+WEATHER = json.loads((Path(__file__).resolve().parent.parent / 'benchmarks' / 'fixtures' / 'weather.json').read_text())
+
+def group_response(url, params):
+    """`group` payload for every requested ID."""
+    ids = [int(city_id) for city_id in params['id'].split(',')]
+    items = [dict(WEATHER, id=city_id, name=f"City {city_id}") for city_id in ids]
+    return FakeResponse(json.dumps({'cnt': len(items), 'list': items}).encode())
+
+def test_budget_is_spent_per_group_call(config, monkeypatch):
+    """Each chunk of grouped cities is exactly one upstream call and one budget unit."""
+    monkeypatch.setattr(config, 'GROUP_SIZE', 2)
+    api = WeatherAPI(cache=MemoryCache())
+    api._session = FakeSession(*[group_response] * 3)
+    warmer = CacheWarmer(api, ['1', '2', '3', '4', '5'], budget=600)
+    try:
+        results = warmer.refresh([('current', city) for city in warmer.cities])
+    finally:
+        warmer.close()
+        api.close()
+    
+    assert sorted(city for _, city, _ in results) == ['1', '2', '3', '4', '5']
+    assert all(error is None for _, _, error in results)
+    assert warmer.stats['calls'] == len(api._session.calls) == 3
+    assert all(url.endswith('/group') for url, _ in api._session.calls)
@@ -0,0 +1,172 @@
+"""Forecast aggregation into daily (or N-hour) summaries.
+
+Works on the columnar ForecastSeries data in a single pass and can
+summarize many cities at once. Uses NumPy when it is installed and falls
+back to pure Python otherwise; both produce the same results.
+
+Buckets are aligned to midnight in each city's own timezone.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+from .models import ForecastSeries
+
+np = None  # NumPy module, imported on first use when installed
+_numpy_checked = False
+
+def _load_numpy():
+    """Import NumPy if available; deferred so that importing this module stays cheap."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # NumPy is optional
+            pass
+        _numpy_checked = True
+    return np
+
+class ForecastSummary:
+    """Aggregated forecast for one time bucket of one city."""
+    
+    __slots__ = ('start', 'date', 'temp_min', 'temp_max', 'temp_mean',
+                 'humidity_mean', 'wind_mean', 'condition', 'slots')
+    
+    def __init__(self, start: int, date: date, temp_min: float, temp_max: float, temp_mean: float,
+                 humidity_mean: float, wind_mean: float, condition: str, slots: int):
+        self.start = start  # Bucket start, Unix time
+        self.date = date  # City-local date of the bucket start
+        self.temp_min = temp_min
+        self.temp_max = temp_max
+        self.temp_mean = temp_mean
+        self.humidity_mean = humidity_mean
+        self.wind_mean = wind_mean
+        self.condition = condition  # Most frequent condition in the bucket
+        self.slots = slots
+    
+    def to_dict(self) -> Dict[str, object]:
+        """Flat dict of all fields, with the date as ISO text."""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values['date'] = self.date.isoformat()
+        return values
+
+def local_date(timestamp: float, tz_offset: int) -> date:
+    """Calendar date at `timestamp` in a timezone `tz_offset` seconds from UTC."""
+    return datetime.fromtimestamp(timestamp + tz_offset, tz=timezone.utc).date()
+
+def relative_day_label(day: date, today: date) -> str:
+    """'Today', 'Tomorrow' or MM/DD."""
+    if day == today:
+        return "Today"
+    if day == today + timedelta(days=1):
+        return "Tomorrow"
+    return day.strftime("%m/%d")
+
+def _summary(bucket: int, bucket_seconds: int, tz_offset: int, **values) -> ForecastSummary:
+    start = bucket * bucket_seconds - tz_offset
+    return ForecastSummary(start=start, date=local_date(start, tz_offset), **values)
+
+def _aggregate_python(series_list: Sequence[ForecastSeries], bucket_seconds: int) -> List[List[ForecastSummary]]:
+    results = []
+    for series in series_list:
+        groups = {}
+        for i in range(len(series)):
+            bucket = (series.dt[i] + series.timezone) // bucket_seconds
+            group = groups.get(bucket)
+            if group is None:
+                group = groups[bucket] = [series.temp[i], series.temp[i], 0.0, 0.0, 0.0, 0, Counter()]
+            temp = series.temp[i]
+            if temp < group[0]:
+                group[0] = temp
+            if temp > group[1]:
+                group[1] = temp
+            group[2] += temp
+            group[3] += series.humidity[i]
+            group[4] += series.wind_speed[i]
+            group[5] += 1
+            group[6][series.condition[i]] += 1
+        
+        summaries = []
+        for bucket in sorted(groups):
+            low, high, temp_sum, humidity_sum, wind_sum, count, conditions = groups[bucket]
+            # Ties go to the condition seen first in the series
+            modal = max(conditions, key=lambda c: (conditions[c], -c))
+            summaries.append(_summary(
+                bucket, bucket_seconds, series.timezone,
+                temp_min=low, temp_max=high, temp_mean=temp_sum / count,
+                humidity_mean=humidity_sum / count, wind_mean=wind_sum / count,
+                condition=series.conditions[modal], slots=count
+            ))
+        results.append(summaries)
+    return results
+
+def _aggregate_numpy(series_list: Sequence[ForecastSeries], bucket_seconds: int) -> List[List[ForecastSummary]]:
+    results = [[] for _ in series_list]
+    lengths = np.array([len(series) for series in series_list], dtype=np.int64)
+    if not lengths.sum():
+        return results
+    
+    # Stack every city's columns; condition codes stay per-city indexes into series.conditions
+    city = np.repeat(np.arange(len(series_list)), lengths)
+    offsets = np.repeat(np.array([series.timezone for series in series_list], dtype=np.int64), lengths)
+    dt = np.concatenate([np.frombuffer(series.dt, dtype=np.int64) for series in series_list])
+    temp = np.concatenate([np.frombuffer(series.temp, dtype=np.float64) for series in series_list])
+    humidity = np.concatenate([np.frombuffer(series.humidity, dtype=np.uint8) for series in series_list])
+    wind = np.concatenate([np.frombuffer(series.wind_speed, dtype=np.float64) for series in series_list])
+    condition = np.concatenate([np.frombuffer(series.condition, dtype=np.uint8) for series in series_list])
+    bucket = (dt + offsets) // bucket_seconds
+    
+    # Make (city, bucket) groups contiguous, then reduce each group in one pass
+    order = np.lexsort((dt, bucket, city))
+    city, bucket, temp, humidity, wind, condition = (
+        column[order] for column in (city, bucket, temp, humidity, wind, condition)
+    )
+    boundary = np.ones(len(city), dtype=bool)
+    boundary[1:] = (city[1:] != city[:-1]) | (bucket[1:] != bucket[:-1])
+    starts = np.flatnonzero(boundary)
+    counts = np.diff(np.append(starts, len(city)))
+    group = np.cumsum(boundary) - 1
+    
+    temp_min = np.minimum.reduceat(temp, starts)
+    temp_max = np.maximum.reduceat(temp, starts)
+    temp_mean = np.add.reduceat(temp, starts) / counts
+    humidity_mean = np.add.reduceat(humidity.astype(np.float64), starts) / counts
+    wind_mean = np.add.reduceat(wind, starts) / counts
+    
+    # Modal condition: histogram of (group, condition), argmax picks the lowest code on ties
+    width = max(len(series.conditions) for series in series_list)
+    histogram = np.bincount(group * width + condition.astype(np.int64), minlength=len(starts) * width)
+    modal = histogram.reshape(len(starts), width).argmax(axis=1)
+    
+    for g, start in enumerate(starts):
+        series = series_list[city[start]]
+        results[city[start]].append(_summary(
+            int(bucket[start]), bucket_seconds, series.timezone,
+            temp_min=float(temp_min[g]), temp_max=float(temp_max[g]), temp_mean=float(temp_mean[g]),
+            humidity_mean=float(humidity_mean[g]), wind_mean=float(wind_mean[g]),
+            condition=series.conditions[modal[g]], slots=int(counts[g])
+        ))
+    return results
+
+def aggregate_many(series_list: Sequence[ForecastSeries], bucket_hours: int = 24,
+                   limit: Optional[int] = None) -> List[List[ForecastSummary]]:
+    """Summarize many forecasts at once; returns one list of buckets per series.
+    
+    `limit` keeps only the first N buckets of each series.
+    """
+    if bucket_hours <= 0 or 24 % bucket_hours:
+        raise ValueError("bucket_hours must divide 24")
+    
+    bucket_seconds = bucket_hours * 3600
+    if _load_numpy() is not None:
+        results = _aggregate_numpy(series_list, bucket_seconds)
+    else:
+        results = _aggregate_python(series_list, bucket_seconds)
+    
+    if limit is not None:
+        results = [summaries[:limit] for summaries in results]
+    return results
+
+def aggregate(series: ForecastSeries, bucket_hours: int = 24, limit: Optional[int] = None) -> List[ForecastSummary]:
+    """Summarize one forecast into buckets of `bucket_hours`."""
+    return aggregate_many([series], bucket_hours, limit)[0]
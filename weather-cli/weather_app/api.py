@@ -1,85 +1,601 @@
 """Weather API client for fetching weather data."""
-import requests
-from typing import Dict, Any, Optional
+import queue
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Callable, ContextManager, Tuple, Type, TypeVar, Union, TYPE_CHECKING
 from .config import Config
-from .cache import WeatherCache
+from . import codec
+from .batch import BatchMixin, BatchResult
+from .cache import BaseCache, create_cache, data_expiry
+from .cities import CityIndex, normalize_city, open_city_index, tidy_city
+from .errors import WeatherAPIError, CityNotFoundError, NoHistoryError, OfflineError, ServiceUnavailableError
+from .history import HistoryStore
+from .metrics import metrics
+from .models import CurrentObservation, ForecastSeries
+from .units import CANONICAL_UNITS
+from .resilience import CircuitBreaker, backoff_delay, retry_after_delay
+from .throttle import Batcher, SingleFlight, TokenBucket, chain
 
-class WeatherAPI:
+if TYPE_CHECKING:
+    import requests
+
+Model = TypeVar('Model', CurrentObservation, ForecastSeries)
+
+class WeatherAPI(BatchMixin):
     """Weather API client."""
     
-    def __init__(self):
+    # Responses worth retrying: rate limited or transient server errors
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, cache: Optional[BaseCache] = None, cities: Optional[CityIndex] = None,
+                 history: Optional[HistoryStore] = None):
         self.api_key = Config.API_KEY
         self.base_url = Config.BASE_URL
-        self.cache = WeatherCache()
+        self.cache = cache if cache is not None else create_cache()
+        self.cities = cities if cities is not None else open_city_index()
+        self.history = history if history is not None else HistoryStore()
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._local = threading.local()
+        self.breaker = CircuitBreaker(Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT)
+        self._refresh_queue = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Condition()
+        self.rate_limiter = None
+        if Config.RATE_LIMIT > 0:
+            self.rate_limiter = TokenBucket(Config.RATE_LIMIT / 60, Config.RATE_LIMIT_BURST)
+        self._inflight = SingleFlight()
+        self._group_batcher = None
+        if Config.GROUP_SIZE > 0:
+            self._group_batcher = Batcher(self._fetch_group, Config.GROUP_SIZE, Config.GROUP_WINDOW)
+        self.throttle_stats = {'rate_limit_waits': 0, 'rate_limit_wait_seconds': 0.0, 'coalesced_requests': 0}
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def session(self) -> 'requests.Session':
+        """Pooled HTTP session, created on first network use.
+        
+        `requests` is imported here rather than at module load so that
+        cache hits never pay for importing it.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+    
+    def _create_session(self) -> 'requests.Session':
+        """Create a long-lived session with a keep-alive connection pool."""
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=Config.HTTP_POOL_SIZE,
+            pool_maxsize=Config.HTTP_POOL_SIZE
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def close(self):
+        """Close pooled connections."""
+        if self._session is not None:
+            self._session.close()
+    
+    @contextmanager
+    def network_status(self, status: Callable[[], ContextManager]):
+        """Wrap network I/O made by the current thread in status(), e.g. a spinner."""
+        previous = getattr(self._local, 'status', None)
+        self._local.status = status
+        try:
+            yield
+        finally:
+            self._local.status = previous
     
-    def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Make API request with error handling."""
+    @property
+    def last_rate_limit_wait(self) -> float:
+        """Seconds the current thread's last request spent queued by the rate limiter."""
+        return getattr(self._local, 'rate_limit_wait', 0.0)
+    
+    def _make_request(self, endpoint: str, params: Dict[str, Any], fail_fast: bool = False) -> Dict[str, Any]:
+        """Make API request with retries, backoff and circuit breaking.
+        
+        Concurrent identical requests (same endpoint and params) share one
+        upstream fetch. With fail_fast, used when last-known data could be
+        served instead, the request is not retried and gives up after
+        Config.FALLBACK_TIMEOUT seconds, including any rate limit wait.
+        """
+        self._local.rate_limit_wait = 0.0
+        key = (endpoint, tuple(sorted(params.items())))
+        
+        def fetch():
+            status = getattr(self._local, 'status', None)
+            with status() if status else nullcontext():
+                return self._request_with_retries(endpoint, params, fail_fast)
+        
+        data, shared = self._inflight.do(key, fetch)
+        if shared:
+            metrics.incr('http.coalesced')
+            with self._stats_lock:
+                self.throttle_stats['coalesced_requests'] += 1
+        return data
+    
+    def _throttle(self, max_wait: Optional[float] = None):
+        """Wait for a rate limiter token, recording how long it took.
+        
+        Raises ServiceUnavailableError if the wait would exceed max_wait.
+        """
+        if self.rate_limiter is None:
+            return
+        
+        with metrics.timer('rate_limit'):
+            waited = self.rate_limiter.acquire(max_wait)
+        if waited is None:
+            metrics.incr('http.rate_limited')
+            raise ServiceUnavailableError("Client-side rate limit reached. Please try again later.")
+        self._local.rate_limit_wait += waited
+        if waited > 0:
+            with self._stats_lock:
+                self.throttle_stats['rate_limit_waits'] += 1
+                self.throttle_stats['rate_limit_wait_seconds'] += waited
+    
+    def _request_with_retries(self, endpoint: str, params: Dict[str, Any], fail_fast: bool = False) -> Dict[str, Any]:
+        """Send the request, retrying timeouts, 429 and 5xx responses with backoff (unless fail_fast)."""
+        with metrics.timer('http.import'):
+            import requests
+        
         url = f"{self.base_url}/{endpoint}"
         params['appid'] = self.api_key
+        retries = 0 if fail_fast else Config.MAX_RETRIES
+        timeout = min(Config.REQUEST_TIMEOUT, Config.FALLBACK_TIMEOUT) if fail_fast else Config.REQUEST_TIMEOUT
         
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+        for attempt in range(retries + 1):
+            self.breaker.before_call()
+            try:
+                self._throttle(timeout if fail_fast else None)
+            except ServiceUnavailableError:
+                self.breaker.abandon()
+                raise
+            retry_after = None
+            
+            if attempt:
+                metrics.incr('http.retries')
+            
+            try:
+                with metrics.timer('network'):
+                    response = self.session.get(url, params=params, timeout=timeout)
+                    # Read the body inside the timer; it is decoded separately below
+                    body_size = len(response.content)
+                    wire_size = response.raw.tell() if response.raw is not None else body_size
+            
+            except requests.exceptions.Timeout:
+                metrics.incr('http.timeouts')
+                self.breaker.record_failure()
+                error = ServiceUnavailableError("Request timed out. Please check your internet connection.")
+            
+            except requests.exceptions.ConnectionError:
+                metrics.incr('http.connection_errors')
+                self.breaker.record_failure()
+                error = ServiceUnavailableError(
+                    "Unable to connect to weather service. Please check your internet connection."
+                )
+            
+            except requests.exceptions.RequestException as e:
+                # E.g. a truncated or undecodable body; also ends a recovery check
+                self.breaker.record_failure()
+                raise WeatherAPIError(f"Error fetching weather data: {e}")
+            
+            except BaseException:
+                # Interrupted before the service answered; free the recovery check
+                self.breaker.abandon()
+                raise
+            
+            else:
+                metrics.incr('http.requests')
+                metrics.incr('http.bytes_received', body_size)
+                metrics.incr('http.bytes_wire', wire_size)
+                metrics.incr(f'http.status.{response.status_code}')
+                if response.status_code in self.RETRY_STATUS_CODES:
+                    self.breaker.record_failure()
+                    if response.status_code == 429:
+                        error = ServiceUnavailableError("Weather service rate limit exceeded. Please try again later.")
+                        retry_after = retry_after_delay(response.headers.get('Retry-After'), Config.BACKOFF_MAX)
+                    else:
+                        error = ServiceUnavailableError(f"Weather service error: HTTP {response.status_code}")
+                else:
+                    # The service answered; client errors don't count against the breaker
+                    self.breaker.record_success()
+                    return self._parse_response(response)
+            
+            if attempt < retries:
+                if retry_after is None:
+                    retry_after = backoff_delay(attempt, Config.BACKOFF_BASE, Config.BACKOFF_MAX)
+                time.sleep(retry_after)
         
-        except requests.exceptions.Timeout:
-            raise Exception("Request timed out. Please check your internet connection.")
+        raise error
+    
+    def _parse_response(self, response: 'requests.Response') -> Dict[str, Any]:
+        """Raise for error statuses and decode the JSON body."""
+        import requests
         
-        except requests.exceptions.ConnectionError:
-            raise Exception("Unable to connect to weather service. Please check your internet connection.")
+        try:
+            response.raise_for_status()
+            with metrics.timer('decode'):
+                return codec.loads(response.content)
         
         except requests.exceptions.HTTPError as e:
             if response.status_code == 401:
-                raise Exception("Invalid API key. Please check your OPENWEATHER_API_KEY.")
+                raise WeatherAPIError("Invalid API key. Please check your OPENWEATHER_API_KEY.")
             elif response.status_code == 404:
-                raise Exception("City not found. Please check the city name and try again.")
+                raise CityNotFoundError("City not found. Please check the city name and try again.")
             else:
-                raise Exception(f"Weather service error: {e}")
+                raise WeatherAPIError(f"Weather service error: {e}")
         
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Error fetching weather data: {e}")
+        except ValueError as e:
+            raise WeatherAPIError(f"Error decoding weather data: {e}")
     
-    def get_current_weather(self, city: str, units: str = 'metric') -> Dict[str, Any]:
-        """Get current weather for a city."""
-        cache_key = f"current_{city}_{units}"
+    def _load_cached(self, cache_key: str, model: Type[Model]) -> Optional[Tuple[Model, bool]]:
+        """Cached model and whether it is stale, or None if missing or unreadable."""
+        cached = self.cache.lookup(cache_key)
+        if cached is None:
+            return None
         
-        # Check cache first
-        cached_data = self.cache.get(cache_key)
-        if cached_data:
-            return cached_data
+        data, stale = cached
+        try:
+            with metrics.timer('cache.decode'):
+                return model.from_cache(data), stale
+        except (ValueError, TypeError, KeyError):
+            return None  # Written by an older version; refetch
+    
+    def _cached(self, cache_key: str, model: Type[Model], refresh: Callable[[], Model]) -> Optional[Model]:
+        """Return the cached model, refreshing stale entries in the background."""
+        cached = self._load_cached(cache_key, model)
+        if cached is None:
+            metrics.incr('cache.misses')
+            return None
         
-        # Fetch from API
-        params = {
-            'q': city,
-            'units': units
-        }
+        value, stale = cached
+        if stale:
+            metrics.incr('cache.stale_served')
+            self._refresh_in_background(cache_key, refresh)
+        else:
+            metrics.incr('cache.hits')
+        return value
+    
+    def _refresh_in_background(self, cache_key: str, refresh: Callable[[], Any]):
+        """Queue refresh for the background workers unless one is already pending for this key.
         
-        data = self._make_request('weather', params)
+        The workers are daemon threads, so pending refreshes never hold up
+        interpreter exit; short-lived processes can give them a moment to
+        finish with wait_for_refreshes.
+        """
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            if self._refresh_queue is None:
+                self._refresh_queue = queue.Queue()
+                for i in range(2):
+                    threading.Thread(target=self._refresh_worker, name=f'weather-refresh-{i}', daemon=True).start()
+        self._refresh_queue.put((cache_key, refresh))
+    
+    def _refresh_worker(self):
+        """Run queued background refreshes."""
+        while True:
+            cache_key, refresh = self._refresh_queue.get()
+            try:
+                refresh()
+            except Exception:
+                # The stale copy was already served; the next caller will retry
+                pass
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+                    self._refresh_lock.notify_all()
+    
+    def wait_for_refreshes(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for background refreshes; False if some are still pending."""
+        with self._refresh_lock:
+            if not self._refreshing:
+                return True
+            with metrics.timer('refresh.wait'):
+                return self._refresh_lock.wait_for(lambda: not self._refreshing, timeout)
+    
+    def resolve_city(self, city: str) -> Tuple[str, Dict[str, Any]]:
+        """Canonical cache key part and query params for a city name.
         
-        # Cache the result
-        self.cache.set(cache_key, data)
+        Names known to the offline city index, or resolved by the API
+        before, map to their city ID so that aliases like "New York" and
+        "new york, us" share one cache entry and are queried by `id`.
+        """
+        name = normalize_city(city)
+        city_id = None
+        if name.isdigit():
+            city_id = int(name)
+        elif self.cities is not None:
+            city_id = self.cities.resolve(name)
         
-        return data
+        if city_id is None:
+            alias = self.cache.get(f"alias_{name}")
+            if alias:
+                metrics.incr('cities.alias_hits')
+                city_id = alias['id']
+        else:
+            metrics.incr('cities.index_hits')
+        
+        if city_id is not None:
+            return f"#{city_id}", {'id': city_id}
+        return name, {'q': tidy_city(city)}
     
-    def get_forecast(self, city: str, days: int = 5, units: str = 'metric') -> Dict[str, Any]:
-        """Get weather forecast for a city."""
-        cache_key = f"forecast_{city}_{days}_{units}"
+    @staticmethod
+    def expires(value: Union[CurrentObservation, ForecastSeries]) -> float:
+        """When cached data goes out of date: at the provider's next update, within the configured limits."""
+        if isinstance(value, CurrentObservation):
+            return data_expiry(value.dt, Config.CURRENT_UPDATE_INTERVAL,
+                               Config.CURRENT_TTL_MIN, Config.CURRENT_TTL_MAX)
+        # Forecasts move on when their first slot has passed
+        return data_expiry(value.dt[0] if len(value) else 0, Config.FORECAST_UPDATE_INTERVAL,
+                           Config.FORECAST_TTL_MIN, Config.FORECAST_TTL_MAX)
+    
+    def _not_found(self, key: str) -> CityNotFoundError:
+        message = "City not found. Please check the city name and try again."
+        suggestions = self.cities.suggest(key) if self.cities is not None and not key.startswith('#') else []
+        if suggestions:
+            message += f" Did you mean: {', '.join(suggestions)}?"
+        return CityNotFoundError(message)
+    
+    def _fetch(self, kind: str, key: str, endpoint: str, params: Dict[str, Any],
+               model: Type[Model], fail_fast: bool = False) -> Model:
+        """Fetch from the API, parse and cache the result, remembering unknown cities briefly."""
+        if self.cache.get(f"missing_{key}"):
+            raise self._not_found(key)
+        
+        try:
+            data = self._make_request(endpoint, params, fail_fast)
+        except CityNotFoundError:
+            raise self._remember_missing(key)
+        return self._accept(kind, key, params, model, data)
+    
+    def _remember_missing(self, key: str) -> CityNotFoundError:
+        """Cache a "city not found" answer briefly and return the error to raise."""
+        self.cache.set(f"missing_{key}", {'city': key}, ttl=Config.NEGATIVE_CACHE_DURATION)
+        return self._not_found(key)
+    
+    def _accept(self, kind: str, key: str, params: Dict[str, Any], model: Type[Model],
+                data: Dict[str, Any]) -> Model:
+        """Parse an API response and cache and record the result."""
+        try:
+            with metrics.timer('parse'):
+                value = model.from_api(data)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise WeatherAPIError(f"Unexpected weather data format: {e}")
+        
+        # Remember which city the API picked for this name, and cache under its ID
+        if 'q' in params and value.city_id:
+            self.cache.set(f"alias_{key}", {'id': value.city_id}, ttl=Config.ALIAS_CACHE_DURATION)
+            key = f"#{value.city_id}"
+        
+        # Cache the compact form
+        self.cache.set(f"{kind}_{key}", value.to_cache(), expires=self.expires(value))
+        self._record_history(key, value)
+        
+        return value
+    
+    def _record_history(self, key: str, value: Union[CurrentObservation, ForecastSeries]):
+        """Append fetched data to the city's history."""
+        if not Config.HISTORY:
+            return
+        try:
+            with metrics.timer('history.append'):
+                self.history.append(key, value)
+        except (OSError, struct.error, ValueError):
+            # History is best effort, like the cache
+            pass
+    
+    def _fetch_group(self, city_ids: List[int]) -> Dict[int, Union[CurrentObservation, Exception]]:
+        """Fetch current weather for up to 20 city IDs in one `group` call and cache each city."""
+        data = self._make_request('group', {'id': ','.join(map(str, sorted(city_ids))), 'units': CANONICAL_UNITS},
+                                  self._group_has_fallback(city_ids))
+        return self._accept_group(city_ids, data)
+    
+    def _group_has_fallback(self, city_ids: List[int]) -> bool:
+        """Whether every city of a `group` call has last-known data to fall back on."""
+        return all(self.cache.fallback(f"current_#{city_id}") is not None for city_id in city_ids)
+    
+    def _accept_group(self, city_ids: List[int], data: Dict[str, Any]) -> Dict[int, Union[CurrentObservation, Exception]]:
+        """Parse a `group` response, caching and recording each city."""
+        metrics.incr('http.group_requests')
+        metrics.incr('http.group_cities', len(city_ids))
+        
+        results = {}
+        for item in data.get('list', []):
+            try:
+                with metrics.timer('parse'):
+                    value = CurrentObservation.from_api(item)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                if isinstance(item, dict) and item.get('id') in city_ids:
+                    results[item['id']] = WeatherAPIError(f"Unexpected weather data format: {e}")
+                continue
+            results[value.city_id] = value
+            self.cache.set(f"current_#{value.city_id}", value.to_cache(), expires=self.expires(value))
+            self._record_history(f"#{value.city_id}", value)
+        
+        # IDs the service left out of the response are unknown
+        for city_id in city_ids:
+            if city_id not in results:
+                results[city_id] = self._remember_missing(f"#{city_id}")
+        return results
+    
+    def _fetch_grouped(self, key: str, city_id: int, wait: bool = True) -> Union[CurrentObservation, Future]:
+        """Fetch current weather for a city ID through the group batcher (a future for it, unless wait)."""
+        if self.cache.get(f"missing_{key}"):
+            raise self._not_found(key)
+        if wait:
+            return self._group_batcher.submit(city_id)
+        return self._group_batcher.submit_async(city_id)
+    
+    def _fallback(self, kind: str, key: str, model: Type[Model]) -> Optional[Model]:
+        """Last-known data for a city from the cache, however stale, marked with its age."""
+        found = self.cache.fallback(f"{kind}_{key}")
+        if found is None:
+            return None
         
-        # Check cache first
-        cached_data = self.cache.get(cache_key)
-        if cached_data:
-            return cached_data
+        data, stored = found
+        try:
+            value = model.from_cache(data)
+        except (ValueError, TypeError, KeyError):
+            return None
+        value.stale_age = max(0, round(time.time() - stored))
+        return value
+    
+    def _offline(self, kind: str, city: str, key: str, model: Type[Model]) -> Model:
+        """Cached data for Config.OFFLINE: fresh if possible, else last-known data."""
+        cached = self._load_cached(f"{kind}_{key}", model)
+        if cached is not None and not cached[1]:
+            metrics.incr('cache.hits')
+            return cached[0]
         
-        # Fetch from API
-        params = {
-            'q': city,
-            'units': units,
-            'cnt': days * 8  # API returns 3-hour intervals, so 8 per day
-        }
+        value = self._fallback(kind, key, model)
+        if value is None:
+            raise OfflineError(f"No cached weather for {city} (offline mode)")
+        metrics.incr('cache.fallback_served')
+        return value
+    
+    def _get_canonical(self, kind: str, city: str, endpoint: str, model: Type[Model],
+                       grouped: bool = False, use_cache: bool = True, wait: bool = True) -> Union[Model, Future]:
+        """Get a metric model from cache or the API, or last-known data when the API is unavailable.
         
-        data = self._make_request('forecast', params)
+        Without wait, a miss that joins a `group` call returns a future for
+        the model instead of blocking until the call is sent.
+        """
+        key, query = self.resolve_city(city)
+        params = dict(query, units=CANONICAL_UNITS)
+        grouped = grouped and 'id' in query and self._group_batcher is not None
+        if grouped:
+            fetch = lambda fail_fast=False: self._fetch_grouped(key, query['id'])
+        else:
+            fetch = lambda fail_fast=False: self._fetch(kind, key, endpoint, dict(params), model, fail_fast)
         
-        # Cache the result
-        self.cache.set(cache_key, data)
+        if Config.OFFLINE:
+            if not use_cache:
+                raise OfflineError(f"Can't refresh {city} in offline mode")
+            return self._offline(kind, city, key, model)
         
-        return data
\ No newline at end of file
+        # Check cache first; a stale copy was already served, so its refresh fails fast
+        fallback = None
+        if use_cache:
+            cached = self._cached(f"{kind}_{key}", model, lambda: fetch(True))
+            if cached is not None:
+                return cached
+            fallback = self._fallback(kind, key, model)
+        
+        # Fetch from API, settling for last-known data if it is unavailable
+        if grouped and not wait:
+            return chain(self._fetch_grouped(key, query['id'], wait=False),
+                         lambda future: self._settle(future.result, fallback))
+        return self._settle(lambda: fetch(fallback is not None), fallback)
+    
+    def _settle(self, fetch: Callable[[], Model], fallback: Optional[Model]) -> Model:
+        """fetch(), or the fallback model if the API is unavailable and there is one."""
+        try:
+            return fetch()
+        except ServiceUnavailableError:
+            if fallback is None:
+                raise
+            metrics.incr('cache.fallback_served')
+            return fallback
+    
+    def cache_key(self, kind: str, city: str) -> str:
+        """Cache key of a city's 'current' or 'forecast' entry."""
+        return f"{kind}_{self.resolve_city(city)[0]}"
+    
+    def can_group(self, city: str) -> bool:
+        """Whether current weather for this city can be fetched in a `group` call."""
+        return self._group_batcher is not None and 'id' in self.resolve_city(city)[1]
+    
+    def refresh(self, kind: str, city: str, grouped: bool = False):
+        """Fetch fresh 'current' or 'forecast' data for a city into the cache, ignoring any cached copy."""
+        if kind == 'current':
+            return self._get_canonical('current', city, 'weather', CurrentObservation, grouped, use_cache=False)
+        return self._get_canonical('forecast', city, 'forecast', ForecastSeries, use_cache=False)
+    
+    def refresh_group(self, city_ids: List[int]) -> Dict[int, Union[CurrentObservation, Exception]]:
+        """Fetch fresh current weather for up to Config.GROUP_SIZE city IDs in exactly one `group` call."""
+        return self._fetch_group(city_ids)
+    
+    def get_current_weather(self, city: str, units: str = 'metric', allow_forecast: Optional[bool] = None,
+                            grouped: bool = False) -> CurrentObservation:
+        """Get current weather for a city.
+        
+        With allow_forecast, a fresh cached forecast answers the request
+        without a separate API call. With grouped, a cache miss for a city
+        with a known ID joins other concurrent misses in one `group` call.
+        """
+        return self._current_weather(city, allow_forecast, grouped).convert(units)
+    
+    def _current_weather(self, city: str, allow_forecast: Optional[bool] = None, grouped: bool = False,
+                         wait: bool = True) -> Union[CurrentObservation, Future]:
+        """Metric current weather for get_current_weather; see _get_canonical for `wait`."""
+        if allow_forecast is None:
+            allow_forecast = Config.CURRENT_FROM_FORECAST
+        
+        if allow_forecast:
+            observation = self._current_from_forecast(self.resolve_city(city)[0])
+            if observation is not None:
+                return observation
+        
+        return self._get_canonical('current', city, 'weather', CurrentObservation, grouped, wait=wait)
+    
+    def _current_from_forecast(self, key: str) -> Optional[CurrentObservation]:
+        """Current conditions from a fresh cached forecast, if there is one and no fresh observation."""
+        if self.cache.get(f"current_{key}"):
+            return None
+        cached = self.cache.get(f"forecast_{key}")
+        try:
+            forecast = ForecastSeries.from_cache(cached) if cached else None
+        except (ValueError, TypeError, KeyError):
+            forecast = None
+        if forecast:
+            return forecast.observation_at(time.time())
+        return None
+    
+    def iter_current_weather_many(self, cities: Iterable[str], units: str = 'metric',
+                                  max_workers: Optional[int] = None) -> Iterator[BatchResult]:
+        """Get current weather for many cities, yielding results in completion order.
+        
+        Cities with known IDs are fetched in `group` calls of up to
+        Config.GROUP_SIZE. Those waiting for their call hold a future rather
+        than a thread, so `max_workers` threads keep up to that many
+        upstream calls in flight.
+        """
+        if self._group_batcher is None:
+            return super().iter_current_weather_many(cities, units, max_workers)
+        
+        def fetch(city: str) -> Union[CurrentObservation, Future]:
+            if not self.can_group(city):
+                return self.get_current_weather(city, units)
+            observation = self._current_weather(city, grouped=True, wait=False)
+            if isinstance(observation, Future):
+                return chain(observation, lambda future: future.result().convert(units))
+            return observation.convert(units)
+        
+        return self._iter_batch(fetch, cities, max_workers)
+    
+    def get_forecast(self, city: str, days: int = 5, units: str = 'metric') -> ForecastSeries:
+        """Get weather forecast for a city."""
+        # Always fetch the full 5-day forecast; shorter ones are sliced locally
+        series = self._get_canonical('forecast', city, 'forecast', ForecastSeries)
+        return series.head(days).convert(units)
+    
+    def get_history(self, city: str, since: float, until: Optional[float] = None,
+                    units: str = 'metric') -> ForecastSeries:
+        """Observations recorded for a city between since and until, read without using the network."""
+        with metrics.timer('history.read'):
+            series = self.history.observations(self.resolve_city(city)[0], since, until)
+        if series is None:
+            raise NoHistoryError(f"No weather recorded for {city} in that period")
+        return series.convert(units)
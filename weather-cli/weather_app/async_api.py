@@ -0,0 +1,687 @@
+"""Asyncio weather client for embedding in async services.
+
+AsyncWeatherAPI offers the lookups of WeatherAPI as coroutines. HTTP goes
+through a pooled non-blocking client (httpx or aiohttp when installed,
+otherwise a small built-in HTTP/1.1 client on asyncio streams), and cache,
+city index and history I/O run on a few shared threads, so thousands of
+lookups in flight cost coroutines rather than threads. Every lookup takes
+an optional deadline and can be cancelled like any other coroutine.
+
+An instance belongs to the event loop it is first used on.
+"""
+import asyncio
+import gzip
+import ssl
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple, Type, Union
+from urllib.parse import urlencode, urlsplit
+from . import codec
+from .api import Model, WeatherAPI
+from .batch import BatchResult
+from .cache import BaseCache
+from .cities import CityIndex
+from .config import Config
+from .errors import WeatherAPIError, CityNotFoundError, DeadlineExceededError, ServiceUnavailableError
+from .history import HistoryStore
+from .metrics import metrics
+from .models import CurrentObservation, ForecastSeries
+from .resilience import backoff_delay, retry_after_delay
+from .units import CANONICAL_UNITS
+
+try:
+    import httpx
+except ImportError:  # httpx is optional
+    httpx = None
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional
+    aiohttp = None
+
+class HTTPResponse(NamedTuple):
+    """A response read in full; `wire_size` is the body size before decompression."""
+    status: int
+    headers: Any  # Mapping with case-insensitive (or lower-case) names
+    body: bytes
+    wire_size: int
+
+class _HTTPXTransport:
+    """GET requests through a pooled httpx.AsyncClient."""
+    
+    def __init__(self, pool_size: int):
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self._client = httpx.AsyncClient(limits=limits)
+    
+    async def get(self, url: str, params: Dict[str, Any], timeout: float) -> HTTPResponse:
+        try:
+            response = await self._client.get(url, params=params, timeout=timeout)
+        except httpx.TimeoutException:
+            raise asyncio.TimeoutError()
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e))
+        except httpx.HTTPError as e:
+            raise WeatherAPIError(f"Error fetching weather data: {e}")
+        return HTTPResponse(response.status_code, response.headers, response.content,
+                            response.num_bytes_downloaded)
+    
+    async def close(self):
+        await self._client.aclose()
+
+class _AIOHTTPTransport:
+    """GET requests through a pooled aiohttp.ClientSession."""
+    
+    def __init__(self, pool_size: int):
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size))
+    
+    async def get(self, url: str, params: Dict[str, Any], timeout: float) -> HTTPResponse:
+        try:
+            async with self._session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                body = await response.read()
+        except asyncio.TimeoutError:
+            raise
+        except aiohttp.ClientConnectionError as e:
+            raise ConnectionError(str(e))
+        except aiohttp.ClientError as e:
+            raise WeatherAPIError(f"Error fetching weather data: {e}")
+        wire_size = int(response.headers.get('Content-Length', len(body)))
+        return HTTPResponse(response.status, response.headers, body, wire_size)
+    
+    async def close(self):
+        await self._session.close()
+
+class _StreamTransport:
+    """Minimal HTTP/1.1 GET client on asyncio streams, with keep-alive connections.
+    
+    Used when neither httpx nor aiohttp is installed. Handles Content-Length
+    and chunked bodies and gzip/deflate encoding; proxies are not supported.
+    """
+    
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self._idle: Dict[Tuple[str, int, bool], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._ssl = None
+    
+    async def get(self, url: str, params: Dict[str, Any], timeout: float) -> HTTPResponse:
+        parts = urlsplit(url)
+        https = parts.scheme == 'https'
+        address = (parts.hostname, parts.port or (443 if https else 80), https)
+        query = urlencode(params)
+        if parts.query:
+            query = f"{parts.query}&{query}"
+        host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        request = (
+            f"GET {parts.path or '/'}?{query} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Accept: application/json\r\n"
+            "Accept-Encoding: gzip, deflate\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode('latin-1')
+        
+        try:
+            return await asyncio.wait_for(self._exchange(address, request), timeout)
+        except asyncio.IncompleteReadError:
+            raise ConnectionError("Connection closed before the response was complete")
+        except (ValueError, zlib.error) as e:
+            raise WeatherAPIError(f"Error fetching weather data: malformed response ({e})")
+    
+    async def _exchange(self, address: Tuple[str, int, bool], request: bytes) -> HTTPResponse:
+        while True:
+            connection = self._checkout(address)
+            reused = connection is not None
+            if connection is None:
+                host, port, https = address
+                if https and self._ssl is None:
+                    self._ssl = ssl.create_default_context()
+                connection = await asyncio.open_connection(host, port, ssl=self._ssl if https else None)
+            
+            reader, writer = connection
+            try:
+                writer.write(request)
+                await writer.drain()
+                response, keep_alive = await self._read_response(reader)
+            except BaseException as e:
+                writer.close()
+                # The server may have closed an idle connection meanwhile; GETs are safe to resend
+                if reused and isinstance(e, (ConnectionError, asyncio.IncompleteReadError)):
+                    continue
+                raise
+            
+            if keep_alive and len(self._idle.setdefault(address, [])) < self.pool_size:
+                self._idle[address].append(connection)
+            else:
+                writer.close()
+            return response
+    
+    def _checkout(self, address: Tuple[str, int, bool]):
+        """An idle connection to address that still looks usable, or None."""
+        idle = self._idle.get(address)
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+    
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> Tuple[HTTPResponse, bool]:
+        """Read one response; returns it and whether the connection can be reused."""
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the server")
+        version, status = line.split(None, 2)[:2]
+        status = int(status)
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if status in (204, 304):
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';', 1)[0], 16)
+                if size == 0:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            # Skip trailers
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        
+        wire_size = len(body)
+        encoding = headers.get('content-encoding', '').lower()
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                body = zlib.decompress(body, -zlib.MAX_WBITS)  # Raw deflate, sent by some servers
+        return HTTPResponse(status, headers, body, wire_size), keep_alive
+    
+    async def close(self):
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+def _create_transport(pool_size: int):
+    """HTTP client selected by Config.ASYNC_HTTP."""
+    choice = Config.ASYNC_HTTP
+    if choice not in ('auto', 'httpx', 'aiohttp', 'builtin'):
+        raise ValueError(f"Unknown async HTTP client: {choice}")
+    if choice == 'httpx' and httpx is None or choice == 'aiohttp' and aiohttp is None:
+        raise ImportError(f"WEATHER_ASYNC_HTTP={choice} but {choice} is not installed")
+    
+    if choice == 'httpx' or choice == 'auto' and httpx is not None:
+        return _HTTPXTransport(pool_size)
+    if choice == 'aiohttp' or choice == 'auto' and aiohttp is not None:
+        return _AIOHTTPTransport(pool_size)
+    return _StreamTransport(pool_size)
+
+class _Flight:
+    """A shared task and the number of callers waiting for it."""
+    
+    __slots__ = ('task', 'waiters')
+    
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class AsyncSingleFlight:
+    """Coalesce concurrent coroutines with the same key into one task.
+    
+    The shared task keeps running while any caller still waits for it, and
+    is cancelled once every caller has been cancelled.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await fn() once per key at a time; returns (result, shared)."""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            
+            def done(_):
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            
+            flight.task.add_done_callback(done)
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+class AsyncBatcher:
+    """Collect concurrent submissions into batches executed with one call of `run`.
+    
+    The asyncio counterpart of throttle.Batcher: `run(keys)` is a coroutine
+    function receiving up to `max_size` keys and returning a mapping of key
+    to result or Exception. A batch is sent once it is full or `window`
+    seconds after its first key arrived. Cancelling a caller does not cancel
+    the batch it joined.
+    """
+    
+    def __init__(self, run: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]], max_size: int, window: float):
+        self.run = run
+        self.max_size = max(1, max_size)
+        self.window = window
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer = None
+        self._running = set()
+    
+    async def submit(self, key: Hashable) -> Any:
+        """Add key to the current batch and wait for its result."""
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            # Nobody may be left to see the outcome once callers are cancelled
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            if len(self._pending) >= self.max_size:
+                self._flush()
+            elif len(self._pending) == 1:
+                self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    async def _execute(self, batch: Dict[Hashable, asyncio.Future]):
+        try:
+            results = await self.run(list(batch))
+        except BaseException as e:
+            # Every caller in the batch gets the error
+            error = e if isinstance(e, Exception) else ServiceUnavailableError("Request cancelled: the client was closed")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(e, Exception):
+                raise
+            return
+        
+        for key, future in batch.items():
+            result = results.get(key)
+            if future.done():
+                continue
+            if result is None:
+                future.set_exception(LookupError(f"No result for {key!r}"))
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    def cancel(self):
+        """Cancel batches in flight and fail callers still waiting."""
+        self._flush()
+        for task in list(self._running):
+            task.cancel()
+
+class AsyncWeatherAPI:
+    """Asyncio weather client with the lookups of WeatherAPI.
+    
+    Cache, city index and history are shared with a WeatherAPI created from
+    the same arguments, so both clients read and write the same entries.
+    Each lookup accepts `timeout`, a deadline in seconds for the whole call
+    including retries; exceeding it raises DeadlineExceededError.
+    """
+    
+    def __init__(self, cache: Optional[BaseCache] = None, cities: Optional[CityIndex] = None,
+                 history: Optional[HistoryStore] = None):
+        self._api = WeatherAPI(cache, cities, history)
+        self.cache = self._api.cache
+        self.cities = self._api.cities
+        self.history = self._api.history
+        self.api_key = Config.API_KEY
+        self.base_url = Config.BASE_URL
+        self.breaker = self._api.breaker
+        self.rate_limiter = self._api.rate_limiter
+        self.throttle_stats = {'rate_limit_waits': 0, 'rate_limit_wait_seconds': 0.0, 'coalesced_requests': 0}
+        self._transport = None
+        self._slots = None
+        self._io_executor = ThreadPoolExecutor(max_workers=max(1, Config.ASYNC_IO_THREADS),
+                                               thread_name_prefix='weather-aio')
+        self._inflight = AsyncSingleFlight()
+        self._group_batcher = None
+        if Config.GROUP_SIZE > 0:
+            self._group_batcher = AsyncBatcher(self._fetch_group, Config.GROUP_SIZE, Config.GROUP_WINDOW)
+        self._refreshing: Dict[str, asyncio.Future] = {}
+    
+    async def __aenter__(self) -> 'AsyncWeatherAPI':
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
+    
+    async def close(self):
+        """Cancel background refreshes and close pooled connections and I/O threads."""
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        if self._group_batcher is not None:
+            self._group_batcher.cancel()
+        if self._transport is not None:
+            await self._transport.close()
+            self._transport = None
+        self._io_executor.shutdown(wait=False)
+        self._api.close()
+    
+    async def _io(self, fn: Callable[..., Any], *args) -> Any:
+        """Run blocking cache, city index or history work on the I/O threads."""
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, fn, *args)
+    
+    @staticmethod
+    async def _within(awaitable: Awaitable[Any], timeout: Optional[float]) -> Any:
+        """Await with an optional deadline, cancelling the work when it passes."""
+        if timeout is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            metrics.incr('async.deadline_exceeded')
+            raise DeadlineExceededError(f"No weather data within {timeout:g}s")
+    
+    async def _make_request(self, endpoint: str, params: Dict[str, Any], fail_fast: bool = False) -> Dict[str, Any]:
+        """Make API request with retries, backoff and circuit breaking.
+        
+        Concurrent identical requests share one upstream fetch, which is
+        cancelled only when every caller waiting for it has been. fail_fast
+        is as for WeatherAPI._make_request.
+        """
+        key = (endpoint, tuple(sorted(params.items())))
+        data, shared = await self._inflight.do(key, lambda: self._request_with_retries(endpoint, params, fail_fast))
+        if shared:
+            metrics.incr('http.coalesced')
+            self.throttle_stats['coalesced_requests'] += 1
+        return data
+    
+    async def _throttle(self, max_wait: Optional[float] = None):
+        """Wait for a rate limiter token without blocking the event loop.
+        
+        Raises ServiceUnavailableError if the wait would exceed max_wait.
+        """
+        if self.rate_limiter is None:
+            return
+        
+        waited = self.rate_limiter.reserve(max_wait)
+        if waited is None:
+            metrics.incr('http.rate_limited')
+            raise ServiceUnavailableError("Client-side rate limit reached. Please try again later.")
+        if waited > 0:
+            with metrics.timer('rate_limit'):
+                await asyncio.sleep(waited)
+            self.throttle_stats['rate_limit_waits'] += 1
+            self.throttle_stats['rate_limit_wait_seconds'] += waited
+    
+    async def _request_with_retries(self, endpoint: str, params: Dict[str, Any], fail_fast: bool = False) -> Dict[str, Any]:
+        """Send the request, retrying timeouts, 429 and 5xx responses with backoff (unless fail_fast)."""
+        if self._transport is None:
+            self._transport = _create_transport(Config.HTTP_POOL_SIZE)
+            # Requests beyond the pool queue here rather than inside the client
+            self._slots = asyncio.Semaphore(Config.HTTP_POOL_SIZE)
+        
+        url = f"{self.base_url}/{endpoint}"
+        params = dict(params, appid=self.api_key)
+        retries = 0 if fail_fast else Config.MAX_RETRIES
+        timeout = min(Config.REQUEST_TIMEOUT, Config.FALLBACK_TIMEOUT) if fail_fast else Config.REQUEST_TIMEOUT
+        
+        for attempt in range(retries + 1):
+            # Fail fast on an open breaker before spending a rate limit token
+            self.breaker.before_call()
+            retry_after = None
+            
+            try:
+                await self._throttle(timeout if fail_fast else None)
+                if attempt:
+                    metrics.incr('http.retries')
+                async with self._slots:
+                    with metrics.timer('network'):
+                        response = await self._transport.get(url, params, timeout)
+            
+            except asyncio.TimeoutError:
+                metrics.incr('http.timeouts')
+                self.breaker.record_failure()
+                error = ServiceUnavailableError("Request timed out. Please check your internet connection.")
+            
+            except OSError:
+                metrics.incr('http.connection_errors')
+                self.breaker.record_failure()
+                error = ServiceUnavailableError(
+                    "Unable to connect to weather service. Please check your internet connection."
+                )
+            
+            except BaseException:
+                # Rate limited, cancelled, or failed before the service answered
+                self.breaker.abandon()
+                raise
+            
+            else:
+                metrics.incr('http.requests')
+                metrics.incr('http.bytes_received', len(response.body))
+                metrics.incr('http.bytes_wire', response.wire_size)
+                metrics.incr(f'http.status.{response.status}')
+                if response.status in WeatherAPI.RETRY_STATUS_CODES:
+                    self.breaker.record_failure()
+                    if response.status == 429:
+                        error = ServiceUnavailableError("Weather service rate limit exceeded. Please try again later.")
+                        retry_after = retry_after_delay(response.headers.get('retry-after'), Config.BACKOFF_MAX)
+                    else:
+                        error = ServiceUnavailableError(f"Weather service error: HTTP {response.status}")
+                else:
+                    # The service answered; client errors don't count against the breaker
+                    self.breaker.record_success()
+                    return self._parse_response(response)
+            
+            if attempt < retries:
+                if retry_after is None:
+                    retry_after = backoff_delay(attempt, Config.BACKOFF_BASE, Config.BACKOFF_MAX)
+                await asyncio.sleep(retry_after)
+        
+        raise error
+    
+    @staticmethod
+    def _parse_response(response: HTTPResponse) -> Dict[str, Any]:
+        """Raise for error statuses and decode the JSON body."""
+        if response.status == 401:
+            raise WeatherAPIError("Invalid API key. Please check your OPENWEATHER_API_KEY.")
+        if response.status == 404:
+            raise CityNotFoundError("City not found. Please check the city name and try again.")
+        if response.status >= 400:
+            raise WeatherAPIError(f"Weather service error: HTTP {response.status}")
+        
+        try:
+            with metrics.timer('decode'):
+                return codec.loads(response.body)
+        except ValueError as e:
+            raise WeatherAPIError(f"Error decoding weather data: {e}")
+    
+    def _resolve_cached(self, kind: str, city: str, model: Type[Model]):
+        """Resolve a city and load its cached entry (or last-known data on a miss), in one trip to the I/O threads."""
+        key, query = self._api.resolve_city(city)
+        cached = self._api._load_cached(f"{kind}_{key}", model)
+        fallback = self._api._fallback(kind, key, model) if cached is None else None
+        return key, query, cached, fallback
+    
+    def _cached(self, cache_key: str, cached: Optional[Tuple[Model, bool]],
+                refresh: Callable[[], Awaitable[Model]]) -> Optional[Model]:
+        """Return the cached model, refreshing stale entries in a background task."""
+        if cached is None:
+            metrics.incr('cache.misses')
+            return None
+        
+        value, stale = cached
+        if stale:
+            metrics.incr('cache.stale_served')
+            self._refresh_in_background(cache_key, refresh)
+        else:
+            metrics.incr('cache.hits')
+        return value
+    
+    def _refresh_in_background(self, cache_key: str, refresh: Callable[[], Awaitable[Any]]):
+        """Start a refresh task unless one is already running for this key."""
+        if cache_key in self._refreshing:
+            return
+        
+        def done(task: asyncio.Future):
+            self._refreshing.pop(cache_key, None)
+            # The stale copy was already served; the next caller will retry
+            if not task.cancelled():
+                task.exception()
+        
+        task = self._refreshing[cache_key] = asyncio.ensure_future(refresh())
+        task.add_done_callback(done)
+    
+    async def _fetch(self, kind: str, key: str, endpoint: str, params: Dict[str, Any],
+                     model: Type[Model], fail_fast: bool = False) -> Model:
+        """Fetch from the API, then parse, cache and record the result on the I/O threads."""
+        if await self._io(self.cache.get, f"missing_{key}"):
+            raise await self._io(self._api._not_found, key)
+        
+        try:
+            data = await self._make_request(endpoint, params, fail_fast)
+        except CityNotFoundError:
+            raise await self._io(self._api._remember_missing, key)
+        return await self._io(self._api._accept, kind, key, params, model, data)
+    
+    async def _fetch_group(self, city_ids: List[int]) -> Dict[int, Union[CurrentObservation, Exception]]:
+        """Fetch current weather for up to 20 city IDs in one `group` call and cache each city."""
+        fail_fast = await self._io(self._api._group_has_fallback, city_ids)
+        data = await self._make_request('group', {'id': ','.join(map(str, sorted(city_ids))), 'units': CANONICAL_UNITS},
+                                        fail_fast)
+        return await self._io(self._api._accept_group, city_ids, data)
+    
+    async def _fetch_grouped(self, key: str, city_id: int) -> CurrentObservation:
+        """Fetch current weather for a city ID through the group batcher."""
+        if await self._io(self.cache.get, f"missing_{key}"):
+            raise await self._io(self._api._not_found, key)
+        return await self._group_batcher.submit(city_id)
+    
+    async def _get_canonical(self, kind: str, city: str, endpoint: str, model: Type[Model],
+                             grouped: bool = False) -> Model:
+        """Get a metric model from cache or the API, or last-known data when the API is unavailable."""
+        if Config.OFFLINE:
+            key, _ = await self._io(self._api.resolve_city, city)
+            return await self._io(self._api._offline, kind, city, key, model)
+        
+        key, query, cached, fallback = await self._io(self._resolve_cached, kind, city, model)
+        params = dict(query, units=CANONICAL_UNITS)
+        if grouped and 'id' in query and self._group_batcher is not None:
+            fetch = lambda fail_fast=False: self._fetch_grouped(key, query['id'])
+        else:
+            fetch = lambda fail_fast=False: self._fetch(kind, key, endpoint, params, model, fail_fast)
+        
+        # A stale copy was already served, so its refresh fails fast
+        value = self._cached(f"{kind}_{key}", cached, lambda: fetch(True))
+        if value is not None:
+            return value
+        
+        try:
+            return await fetch(fallback is not None)
+        except ServiceUnavailableError:
+            if fallback is None:
+                raise
+            metrics.incr('cache.fallback_served')
+            return fallback
+    
+    async def get_current_weather(self, city: str, units: str = 'metric', allow_forecast: Optional[bool] = None,
+                                  grouped: bool = False, timeout: Optional[float] = None) -> CurrentObservation:
+        """Get current weather for a city; see WeatherAPI.get_current_weather."""
+        if allow_forecast is None:
+            allow_forecast = Config.CURRENT_FROM_FORECAST
+        
+        async def lookup() -> CurrentObservation:
+            if allow_forecast:
+                key = (await self._io(self._api.resolve_city, city))[0]
+                observation = await self._io(self._api._current_from_forecast, key)
+                if observation is not None:
+                    return observation.convert(units)
+            
+            observation = await self._get_canonical('current', city, 'weather', CurrentObservation, grouped)
+            return observation.convert(units)
+        
+        return await self._within(lookup(), timeout)
+    
+    async def get_forecast(self, city: str, days: int = 5, units: str = 'metric',
+                           timeout: Optional[float] = None) -> ForecastSeries:
+        """Get weather forecast for a city."""
+        series = await self._within(self._get_canonical('forecast', city, 'forecast', ForecastSeries), timeout)
+        return series.head(days).convert(units)
+    
+    async def get_history(self, city: str, since: float, until: Optional[float] = None,
+                          units: str = 'metric') -> ForecastSeries:
+        """Observations recorded for a city between since and until, read without using the network."""
+        return await self._io(self._api.get_history, city, since, until, units)
+    
+    async def _iter_batch(self, fetch: Callable[[str], Awaitable[Any]],
+                          cities: Iterable[str]) -> AsyncIterator[BatchResult]:
+        """Run fetch for every city concurrently, yielding results as they complete."""
+        async def run(city: str) -> BatchResult:
+            try:
+                return city, await fetch(city), None
+            except Exception as e:
+                # A failing city reports its own error without aborting the batch
+                return city, None, e
+        
+        tasks = [asyncio.ensure_future(run(city)) for city in dict.fromkeys(cities)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer stopped early or was cancelled
+            for task in tasks:
+                task.cancel()
+    
+    def iter_current_weather_many(self, cities: Iterable[str], units: str = 'metric',
+                                  timeout: Optional[float] = None) -> AsyncIterator[BatchResult]:
+        """Get current weather for many cities, yielding (city, data, error) in completion order.
+        
+        Cities with known IDs share `group` calls. `timeout` is the deadline
+        of each city's lookup.
+        """
+        return self._iter_batch(lambda city: self.get_current_weather(city, units, grouped=True, timeout=timeout),
+                                cities)
+    
+    def iter_forecast_many(self, cities: Iterable[str], days: int = 5, units: str = 'metric',
+                           timeout: Optional[float] = None) -> AsyncIterator[BatchResult]:
+        """Get forecasts for many cities, yielding (city, data, error) in completion order."""
+        return self._iter_batch(lambda city: self.get_forecast(city, days, units, timeout), cities)
+    
+    async def get_current_weather_many(self, cities: Iterable[str], units: str = 'metric',
+                                       timeout: Optional[float] = None) -> List[BatchResult]:
+        """Get current weather for many cities concurrently, in input order."""
+        cities = list(dict.fromkeys(cities))
+        results = {r[0]: r async for r in self.iter_current_weather_many(cities, units, timeout)}
+        return [results[city] for city in cities]
+    
+    async def get_forecast_many(self, cities: Iterable[str], days: int = 5, units: str = 'metric',
+                                timeout: Optional[float] = None) -> List[BatchResult]:
+        """Get forecasts for many cities concurrently, in input order."""
+        cities = list(dict.fromkeys(cities))
+        results = {r[0]: r async for r in self.iter_forecast_many(cities, days, units, timeout)}
+        return [results[city] for city in cities]
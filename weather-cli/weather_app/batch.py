@@ -0,0 +1,78 @@
+"""Concurrent multi-city fetching shared by the weather clients."""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Optional, Callable, Iterable, Iterator, List, Tuple
+from .config import Config
+
+# (city, data, error) - exactly one of data/error is set; data is a
+# CurrentObservation or ForecastSeries
+BatchResult = Tuple[str, Optional[Any], Optional[Exception]]
+
+class BatchMixin:
+    """Batch methods for any client providing get_current_weather and get_forecast."""
+    
+    def _iter_batch(self, fetch: Callable[[str], Any], cities: Iterable[str],
+                    max_workers: Optional[int] = None) -> Iterator[BatchResult]:
+        """Run fetch for each city on a bounded thread pool, yielding results as they complete.
+        
+        Cities are read from the iterable as workers free up, so long city
+        lists stream through in constant memory. fetch may return a Future
+        (e.g. for a city waiting to join a batched call); the city then
+        completes with it without holding a worker.
+        """
+        workers = max(1, max_workers or Config.BATCH_CONCURRENCY)
+        cities = iter(cities)
+        seen = set()  # Drop duplicates
+        pending = {}
+        waiting = {}  # Futures returned by fetch
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # Keep a couple of cities queued per worker
+                if len(pending) < workers * 2:
+                    for city in cities:
+                        if city in seen:
+                            continue
+                        seen.add(city)
+                        pending[executor.submit(fetch, city)] = city
+                        if len(pending) >= workers * 2:
+                            break
+                if not pending and not waiting:
+                    return
+                
+                done, _ = wait([*pending, *waiting], return_when=FIRST_COMPLETED)
+                for future in done:
+                    city = pending.pop(future) if future in pending else waiting.pop(future)
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        # A failing city reports its own error without aborting the batch
+                        yield city, None, e
+                    else:
+                        if isinstance(data, Future):
+                            waiting[data] = city
+                        else:
+                            yield city, data, None
+    
+    def iter_current_weather_many(self, cities: Iterable[str], units: str = 'metric',
+                                  max_workers: Optional[int] = None) -> Iterator[BatchResult]:
+        """Get current weather for many cities, yielding results in completion order."""
+        return self._iter_batch(lambda city: self.get_current_weather(city, units), cities, max_workers)
+    
+    def iter_forecast_many(self, cities: Iterable[str], days: int = 5, units: str = 'metric',
+                           max_workers: Optional[int] = None) -> Iterator[BatchResult]:
+        """Get forecasts for many cities, yielding results in completion order."""
+        return self._iter_batch(lambda city: self.get_forecast(city, days, units), cities, max_workers)
+    
+    def get_current_weather_many(self, cities: Iterable[str], units: str = 'metric',
+                                 max_workers: Optional[int] = None) -> List[BatchResult]:
+        """Get current weather for many cities concurrently, in input order."""
+        cities = list(dict.fromkeys(cities))
+        results = {r[0]: r for r in self.iter_current_weather_many(cities, units, max_workers)}
+        return [results[city] for city in cities]
+    
+    def get_forecast_many(self, cities: Iterable[str], days: int = 5, units: str = 'metric',
+                          max_workers: Optional[int] = None) -> List[BatchResult]:
+        """Get forecasts for many cities concurrently, in input order."""
+        cities = list(dict.fromkeys(cities))
+        results = {r[0]: r for r in self.iter_forecast_many(cities, days, units, max_workers)}
+        return [results[city] for city in cities]
\ No newline at end of file
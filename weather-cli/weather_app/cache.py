@@ -1,16 +1,160 @@
-"""Simple file-based caching system for weather data."""
-import json
+"""Caching backends for weather data."""
+import math
+import os
+import sqlite3
+import tempfile
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+from . import codec
 from .config import Config
+from .metrics import metrics
 
-class WeatherCache:
+def data_expiry(reference: float, interval: float, floor: float, ceiling: float,
+                now: Optional[float] = None) -> float:
+    """Expiry time for data the provider updates every `interval` seconds.
+    
+    The data is assumed to change at `reference + k * interval`; it expires
+    at the first such time after now, but no sooner than `floor` and no
+    later than `ceiling` seconds from now. Without a reference time the
+    ceiling is used.
+    """
+    now = time.time() if now is None else now
+    if not reference or interval <= 0:
+        return now + ceiling
+    next_update = reference + (math.floor((now - reference) / interval) + 1) * interval
+    return now + min(max(next_update - now, floor), ceiling)
+
+def _entry_expiry(entry: Dict[str, Any], default_ttl: float) -> float:
+    """Expiry of a cache entry, including ones written with a timestamp and TTL by older versions."""
+    if 'expires' in entry:
+        return entry['expires']
+    return entry.get('timestamp', 0) + (entry.get('ttl') or default_ttl)
+
+def _entry_stored(entry: Dict[str, Any], default_ttl: float) -> float:
+    """When a cache entry was written; entries from older versions count from their expiry."""
+    return entry.get('stored') or entry.get('timestamp') or _entry_expiry(entry, default_ttl)
+
+class BaseCache:
+    """Common expiry logic shared by the cache backends.
+    
+    Backends store entries of the form {'stored': ..., 'expires': ...,
+    'data': ...} and implement `_load`, `_store`, `_delete` and `clear`.
+    Entries past their expiry are kept for up to `max_stale` more seconds so
+    they can be served while a fresh copy is fetched (stale-while-revalidate).
+    After that, weather data moves to the fallback area (keys prefixed with
+    FALLBACK_PREFIX), where `fallback` finds it until `fallback_age` seconds
+    after it was stored.
+    """
+    
+    FALLBACK_PREFIX = 'fallback_'
+    FALLBACK_KEYS = ('current_', 'forecast_')  # Entries worth serving when nothing fresher can be had
+    
+    def __init__(self):
+        self.cache_duration = Config.CACHE_DURATION
+        self.max_stale = Config.CACHE_MAX_STALE
+        self.fallback_age = Config.FALLBACK_MAX_AGE
+    
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Load a raw cache entry, or None if missing or unreadable."""
+        raise NotImplementedError
+    
+    def _store(self, key: str, entry: Dict[str, Any]):
+        """Store a raw cache entry."""
+        raise NotImplementedError
+    
+    def _delete(self, key: str):
+        """Delete a raw cache entry if present."""
+        raise NotImplementedError
+    
+    def lookup(self, key: str) -> Optional[Tuple[Dict[Any, Any], bool]]:
+        """Get cached data and whether it is stale, or None if missing or too old."""
+        with metrics.timer('cache.load'):
+            entry = self._load(key)
+        if entry is None:
+            return None
+        
+        overdue = time.time() - _entry_expiry(entry, self.cache_duration)
+        
+        # Entries too old to be served even as stale leave the main area
+        if overdue > self.max_stale:
+            if self._keeps_fallback(key, entry):
+                self._store(self.FALLBACK_PREFIX + key, entry)
+            self._delete(key)
+            return None
+        
+        return entry.get('data'), overdue > 0
+    
+    def _keeps_fallback(self, key: str, entry: Dict[str, Any]) -> bool:
+        """Whether an expired entry should move to the fallback area."""
+        return (self.fallback_age > 0 and key.startswith(self.FALLBACK_KEYS)
+                and time.time() - _entry_stored(entry, self.cache_duration) <= self.fallback_age)
+    
+    def fallback(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Last known data for a key however stale, and when it was stored.
+        
+        Looks in the main area and then the fallback area; None if neither
+        has data younger than `fallback_age`.
+        """
+        if self.fallback_age <= 0:
+            return None
+        
+        for name in (key, self.FALLBACK_PREFIX + key):
+            with metrics.timer('cache.load'):
+                entry = self._load(name)
+            if entry is None:
+                continue
+            stored = _entry_stored(entry, self.cache_duration)
+            if time.time() - stored <= self.fallback_age:
+                return entry.get('data'), stored
+            if name != key:
+                self._delete(name)  # Too old to be of use
+        return None
+    
+    def expires_at(self, key: str) -> Optional[float]:
+        """Unix time at which an entry stops being fresh, or None if it is missing."""
+        entry = self._load(key)
+        if entry is None:
+            return None
+        return _entry_expiry(entry, self.cache_duration)
+    
+    def get(self, key: str) -> Optional[Dict[Any, Any]]:
+        """Get cached data if it exists and is not expired."""
+        cached = self.lookup(key)
+        if cached is None or cached[1]:
+            return None
+        return cached[0]
+    
+    def set(self, key: str, data: Dict[Any, Any], ttl: Optional[float] = None,
+            expires: Optional[float] = None):
+        """Cache data until `expires`, or for `ttl` seconds (default: the cache duration)."""
+        now = time.time()
+        if expires is None:
+            expires = now + (ttl if ttl is not None else self.cache_duration)
+        entry = {
+            'stored': now,
+            'expires': expires,
+            'data': data
+        }
+        with metrics.timer('cache.store'):
+            self._store(key, entry)
+    
+    def clear(self):
+        """Clear all cached data."""
+        raise NotImplementedError
+    
+    def disk_usage(self) -> Optional[Tuple[int, int]]:
+        """Number of entries and bytes on disk, or None for in-memory backends."""
+        return None
+
+class WeatherCache(BaseCache):
     """Simple file-based cache for weather data."""
     
     def __init__(self):
+        super().__init__()
         self.cache_dir = Config.CACHE_DIR
-        self.cache_duration = Config.CACHE_DURATION
         self._ensure_cache_dir()
     
     def _ensure_cache_dir(self):
@@ -22,48 +166,379 @@ class WeatherCache:
         safe_key = key.lower().replace(' ', '_').replace(',', '').replace('/', '_')
         return self.cache_dir / f"{safe_key}.json"
     
-    def get(self, key: str) -> Optional[Dict[Any, Any]]:
-        """Get cached data if it exists and is not expired."""
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
         cache_file = self._get_cache_file(key)
         
-        if not cache_file.exists():
-            return None
-        
         try:
-            with open(cache_file, 'r') as f:
-                cached_data = json.load(f)
-            
-            # Check if cache is expired
-            if time.time() - cached_data.get('timestamp', 0) > self.cache_duration:
-                cache_file.unlink()  # Remove expired cache
-                return None
-            
-            return cached_data.get('data')
+            with open(cache_file, 'rb') as f:
+                raw = f.read()
+            metrics.incr('cache.bytes_read', len(raw))
+            return codec.decode_entry(raw)
+        
+        except FileNotFoundError:
+            return None
         
-        except (json.JSONDecodeError, KeyError, FileNotFoundError):
+        except codec.DECODE_ERRORS:
             # If cache file is corrupted, remove it
-            if cache_file.exists():
-                cache_file.unlink()
+            self._delete(key)
             return None
     
-    def set(self, key: str, data: Dict[Any, Any]):
-        """Cache data with current timestamp."""
+    def _store(self, key: str, entry: Dict[str, Any]):
         cache_file = self._get_cache_file(key)
         
-        cached_data = {
-            'timestamp': time.time(),
-            'data': data
-        }
-        
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(cached_data, f, indent=2)
-        except Exception as e:
+            # Write to a temporary file and rename it into place so that
+            # concurrent readers never see a half-written entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    data = codec.encode_entry(entry)
+                    f.write(data)
+                metrics.incr('cache.bytes_written', len(data))
+                os.replace(tmp_path, cache_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception:
             # If we can't write to cache, just continue without caching
             pass
     
+    def _delete(self, key: str):
+        try:
+            self._get_cache_file(key).unlink()
+        except FileNotFoundError:
+            pass
+    
     def clear(self):
         """Clear all cached data."""
         if self.cache_dir.exists():
             for cache_file in self.cache_dir.glob("*.json"):
-                cache_file.unlink()
\ No newline at end of file
+                cache_file.unlink()
+    
+    def disk_usage(self) -> Optional[Tuple[int, int]]:
+        """Number of entry files and their total size."""
+        sizes = [path.stat().st_size for path in self.cache_dir.glob("*.json")]
+        return len(sizes), sum(sizes)
+
+class MemoryCache(BaseCache):
+    """Thread-safe in-process cache, used by the long-running daemon.
+    
+    Holds at most `max_entries` entries and about `max_bytes` of serialized
+    data, dropping the least recently used ones beyond that, so a process
+    that runs for weeks doesn't keep every city it was ever asked about.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        super().__init__()
+        self.max_entries = max_entries if max_entries is not None else Config.DAEMON_CACHE_ENTRIES
+        self.max_bytes = max_bytes if max_bytes is not None else Config.DAEMON_CACHE_BYTES
+        self._entries: 'OrderedDict[str, Tuple[Dict[str, Any], int]]' = OrderedDict()  # entry, size
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            self._entries.move_to_end(key)
+            return item[0]
+    
+    def _store(self, key: str, entry: Dict[str, Any]):
+        size = len(codec.dumps(entry['data']))
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (entry, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+    
+    def _discard(self, key: str):
+        """Drop an entry (caller holds the lock)."""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+    
+    def _delete(self, key: str):
+        with self._lock:
+            self._discard(key)
+    
+    def clear(self):
+        """Clear all cached data."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def memory_usage(self) -> Tuple[int, int]:
+        """Entries and approximate bytes held."""
+        with self._lock:
+            return len(self._entries), self._bytes
+
+class TieredCache(BaseCache):
+    """Bounded in-memory LRU tier in front of another cache backend.
+    
+    Reads are served from memory when possible and fall through to the
+    backend otherwise; writes go to both (write-through). An entry is kept
+    in memory for at most `ttl` seconds, so changes written to the backend
+    by other processes are picked up. The memory tier holds at most
+    `max_entries` entries and about `max_bytes` of serialized data.
+    """
+    
+    def __init__(self, backend: BaseCache, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        super().__init__()
+        self.backend = backend
+        self.max_entries = max_entries if max_entries is not None else Config.MEMORY_CACHE_ENTRIES
+        self.max_bytes = max_bytes if max_bytes is not None else Config.MEMORY_CACHE_BYTES
+        self.ttl = ttl if ttl is not None else Config.MEMORY_CACHE_TTL
+        self._entries: 'OrderedDict[str, Tuple[Dict[str, Any], float, int]]' = OrderedDict()  # entry, loaded, size
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0}
+    
+    def _count(self, name: str):
+        """Count a per-tier hit or miss (caller holds the lock)."""
+        self.stats[name] += 1
+        metrics.incr(f"cache.{name.replace('_', '.')}")
+    
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        """Put an entry in the memory tier, evicting least recently used ones over the limits."""
+        size = len(codec.dumps(entry['data']))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (entry, time.monotonic(), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][2]
+    
+    def _forget(self, key: str):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+    
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and time.monotonic() - cached[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self._count('l1_hits')
+                return cached[0]
+            self._count('l1_misses')
+        
+        entry = self.backend._load(key)
+        with self._lock:
+            self._count('l2_hits' if entry is not None else 'l2_misses')
+        if entry is None:
+            self._forget(key)
+            return None
+        self._remember(key, entry)
+        return entry
+    
+    def _store(self, key: str, entry: Dict[str, Any]):
+        self.backend._store(key, entry)
+        self._remember(key, entry)
+    
+    def _delete(self, key: str):
+        self._forget(key)
+        self.backend._delete(key)
+    
+    def clear(self):
+        """Clear both tiers."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        self.backend.clear()
+    
+    def memory_usage(self) -> Tuple[int, int]:
+        """Entries and approximate bytes held in memory."""
+        with self._lock:
+            return len(self._entries), self._bytes
+    
+    def disk_usage(self) -> Optional[Tuple[int, int]]:
+        """Disk usage of the backend."""
+        return self.backend.disk_usage()
+
+class SQLiteWeatherCache(BaseCache):
+    """Single-file SQLite cache with LRU eviction.
+    
+    Uses WAL mode so several CLI processes can read and write concurrently,
+    keeps at most `max_entries` entries (least recently used are evicted
+    first) and expires entries in bulk.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, max_entries: Optional[int] = None):
+        super().__init__()
+        self.path = Path(path or Config.CACHE_DIR / 'cache.sqlite3')
+        self.max_entries = max_entries if max_entries is not None else Config.CACHE_MAX_ENTRIES
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_entries ('
+            ' key TEXT PRIMARY KEY,'
+            ' expires REAL NOT NULL,'
+            ' accessed REAL NOT NULL,'
+            ' data TEXT NOT NULL,'
+            ' stored REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)')
+        self._migrate()
+    
+    def _migrate(self):
+        """Add columns missing from older databases and move entries from the old timestamp/TTL table."""
+        if 'stored' not in {row[1] for row in self._conn.execute('PRAGMA table_info(cache_entries)')}:
+            try:
+                self._conn.execute('ALTER TABLE cache_entries ADD COLUMN stored REAL')
+            except sqlite3.OperationalError:
+                pass  # Added by another process meanwhile
+        
+        if not self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'entries'").fetchone():
+            return
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have migrated it meanwhile
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(entries)')}
+            if not columns:
+                self._conn.execute('COMMIT')
+                return
+            ttl = 'COALESCE(ttl, ?)' if 'ttl' in columns else '?'
+            self._conn.execute(
+                f'INSERT OR IGNORE INTO cache_entries (key, expires, accessed, data, stored)'
+                f' SELECT key, timestamp + {ttl}, accessed, data, timestamp FROM entries',
+                (self.cache_duration,)
+            )
+            self._conn.execute('DROP TABLE entries')
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+    
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT expires, data, stored FROM cache_entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE cache_entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        
+        try:
+            metrics.incr('cache.bytes_read', len(row[1]))
+            return {'stored': row[2], 'expires': row[0], 'data': codec.decode_entry(row[1])}
+        except codec.DECODE_ERRORS:
+            self._delete(key)
+            return None
+    
+    def _store(self, key: str, entry: Dict[str, Any]):
+        try:
+            data = codec.encode_entry(entry['data'])
+            metrics.incr('cache.bytes_written', len(data))
+            with self._lock:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO cache_entries (key, expires, accessed, data, stored) VALUES (?, ?, ?, ?, ?)',
+                        (key, entry['expires'], time.time(), data, entry.get('stored'))
+                    )
+                    self._evict()
+                    self._conn.execute('COMMIT')
+                except BaseException:
+                    self._conn.execute('ROLLBACK')
+                    raise
+        except (sqlite3.Error, TypeError, ValueError):
+            # If we can't write to cache, just continue without caching
+            pass
+    
+    def _evict(self):
+        """Drop expired entries, then least recently used entries beyond the size cap."""
+        self._purge_expired()
+        if not self.max_entries:
+            return
+        self._conn.execute(
+            'DELETE FROM cache_entries WHERE key IN ('
+            ' SELECT key FROM cache_entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+    
+    def _delete(self, key: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+    
+    def _purge_expired(self) -> int:
+        """Delete entries past their expiry and stale window (caller holds the lock).
+        
+        Weather data among them moves to the fallback area, and fallback
+        entries older than `fallback_age` are deleted.
+        """
+        now = time.time()
+        fallback = self.FALLBACK_PREFIX + '*'
+        if self.fallback_age > 0:
+            kinds = ' OR '.join('key GLOB ?' for _ in self.FALLBACK_KEYS)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, expires, accessed, data, stored)'
+                ' SELECT ? || key, expires, accessed, data, stored FROM cache_entries'
+                f' WHERE expires < ? AND ({kinds}) AND COALESCE(stored, expires) >= ?',
+                (self.FALLBACK_PREFIX, now - self.max_stale,
+                 *(kind + '*' for kind in self.FALLBACK_KEYS), now - self.fallback_age)
+            )
+        cursor = self._conn.execute(
+            'DELETE FROM cache_entries WHERE expires < ? AND key NOT GLOB ?', (now - self.max_stale, fallback)
+        )
+        self._conn.execute(
+            'DELETE FROM cache_entries WHERE key GLOB ? AND COALESCE(stored, expires) < ?',
+            (fallback, now - self.fallback_age)
+        )
+        return cursor.rowcount
+    
+    def purge_expired(self) -> int:
+        """Delete (or move to the fallback area) all expired entries in bulk; returns how many left the main area."""
+        with self._lock:
+            return self._purge_expired()
+    
+    def clear(self):
+        """Clear all cached data."""
+        with self._lock:
+            self._conn.execute('DELETE FROM cache_entries')
+    
+    def disk_usage(self) -> Optional[Tuple[int, int]]:
+        """Number of entries and the size of the database files."""
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        size = sum(path.stat().st_size for path in (self.path, self.path.with_name(self.path.name + '-wal'))
+                   if path.exists())
+        return count, size
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+def create_cache() -> BaseCache:
+    """Create the cache backend selected by Config.CACHE_BACKEND.
+    
+    Disk backends get an in-memory tier in front unless
+    Config.MEMORY_CACHE_ENTRIES is 0.
+    """
+    backend = Config.CACHE_BACKEND
+    if backend == 'memory':
+        return MemoryCache()
+    if backend == 'sqlite':
+        cache = SQLiteWeatherCache()
+    elif backend == 'file':
+        cache = WeatherCache()
+    else:
+        raise ValueError(f"Unknown cache backend: {backend!r} (expected 'file', 'sqlite' or 'memory')")
+    if Config.MEMORY_CACHE_ENTRIES > 0:
+        return TieredCache(cache)
+    return cache
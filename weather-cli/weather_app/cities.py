@@ -0,0 +1,200 @@
+"""Offline city index for resolving names to OpenWeatherMap city IDs.
+
+The index is built once from the OpenWeatherMap city list dump
+(city.list.json.gz from https://bulk.openweathermap.org/sample/) into a
+compact binary file that is memory-mapped on use, so opening it costs
+nothing and each lookup is a binary search over the sorted names.
+
+File layout (little-endian):
+
+    header   b'WCIDX1\\0\\0', uint32 count, uint32 records offset
+    table    count x (uint32 record offset, uint32 city id), sorted by key
+    records  "key\\tname\\tstate\\tcountry\\n" per city, UTF-8
+"""
+import difflib
+import gzip
+import json
+import mmap
+import os
+import struct
+import unicodedata
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from .config import Config
+
+MAGIC = b'WCIDX1\0\0'
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<II')
+
+class City(NamedTuple):
+    """One city from the index."""
+    id: int
+    name: str
+    state: str
+    country: str
+    
+    @property
+    def label(self) -> str:
+        """Display form, e.g. 'Portland, OR, US'."""
+        return ', '.join(part for part in (self.name, self.state, self.country) if part)
+
+def _fold_accent(char: str) -> str:
+    """Latin letters without their accents; other scripts' marks are part of the spelling."""
+    if not unicodedata.name(char, '').startswith('LATIN '):
+        return char
+    return ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+
+def tidy_city(text: str) -> str:
+    """A city query as typed, with spacing and commas tidied: "  New York , US" -> "New York,US"."""
+    parts = (' '.join(part.split()) for part in text.split(','))
+    return ','.join(part for part in parts if part)
+
+def normalize_city(text: str) -> str:
+    """Canonical form of a city query: Latin accents folded, lowercase, tidy spacing and commas.
+    
+    "  New York, US" and "new york,us" both become "new york,us". Only
+    used for matching; the API is sent the name as typed (see tidy_city).
+    """
+    text = unicodedata.normalize('NFKC', text)
+    return tidy_city(''.join(_fold_accent(c) for c in text).casefold())
+
+def split_query(query: str) -> Tuple[str, str, str]:
+    """Split a normalized query into (name, state, country)."""
+    parts = query.split(',')
+    name = parts[0]
+    if len(parts) >= 3:
+        return name, parts[1], parts[2]
+    if len(parts) == 2:
+        return name, '', parts[1]
+    return name, '', ''
+
+class CityIndex:
+    """Read-only, memory-mapped city index."""
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._records = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a city index")
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def close(self):
+        """Unmap the index file."""
+        self._map.close()
+    
+    def _entry(self, i: int) -> Tuple[int, int]:
+        return ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+    
+    def _key(self, i: int) -> str:
+        offset = self._records + self._entry(i)[0]
+        return self._map[offset:self._map.find(b'\t', offset)].decode('utf-8')
+    
+    def _city(self, i: int) -> City:
+        offset, city_id = self._entry(i)
+        offset += self._records
+        line = self._map[offset:self._map.find(b'\n', offset)].decode('utf-8')
+        _, name, state, country = line.split('\t')
+        return City(city_id, name, state, country)
+    
+    def _lower_bound(self, key: str) -> int:
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+    
+    def _scan(self, prefix: str) -> Iterator[int]:
+        """Indexes of all entries whose key starts with prefix, in key order."""
+        i = self._lower_bound(prefix)
+        while i < self.count and self._key(i).startswith(prefix):
+            yield i
+            i += 1
+    
+    def find(self, query: str) -> List[City]:
+        """All cities matching a query like 'london', 'london,gb' or 'portland,or,us'."""
+        name, state, country = split_query(normalize_city(query))
+        matches = []
+        for i in self._scan(name):
+            if self._key(i) != name:
+                break
+            city = self._city(i)
+            if country and city.country.lower() != country:
+                continue
+            if state and city.state.lower() != state:
+                continue
+            matches.append(city)
+        return matches
+    
+    def resolve(self, query: str) -> Optional[int]:
+        """City ID for a query, or None if it is unknown or ambiguous."""
+        matches = self.find(query)
+        return matches[0].id if len(matches) == 1 else None
+    
+    def complete(self, prefix: str, limit: int = 10) -> List[City]:
+        """Cities whose name starts with prefix, for autocompletion."""
+        results = []
+        for i in self._scan(split_query(normalize_city(prefix))[0]):
+            results.append(self._city(i))
+            if len(results) >= limit:
+                break
+        return results
+    
+    def suggest(self, query: str, limit: int = 5) -> List[str]:
+        """Close spellings of an unknown city name."""
+        name = split_query(normalize_city(query))[0]
+        if not name:
+            return []
+        # Only names sharing the first letter are compared, which keeps this fast
+        candidates = {self._key(i) for i in self._scan(name[0])}
+        matches = difflib.get_close_matches(name, candidates, n=limit, cutoff=0.75)
+        return [self._city(self._lower_bound(match)).name for match in matches]
+    
+    @classmethod
+    def build(cls, source: Path, path: Optional[Path] = None) -> 'CityIndex':
+        """Build an index file from a city.list.json(.gz) dump and open it."""
+        source = Path(source)
+        path = Path(path or Config.CITY_INDEX)
+        opener = gzip.open if source.suffix == '.gz' else open
+        with opener(source, 'rt', encoding='utf-8') as f:
+            cities = json.load(f)
+        
+        rows = []
+        for city in cities:
+            name = ' '.join(str(city.get('name', '')).split())
+            key = ' '.join(normalize_city(name).replace(',', ' ').split())
+            if not key:
+                continue
+            rows.append((key, city.get('country', ''), city.get('state', '') or '', int(city['id']), name))
+        rows.sort()
+        
+        table = bytearray()
+        records = bytearray()
+        for key, country, state, city_id, name in rows:
+            table += ENTRY.pack(len(records), city_id)
+            records += f"{key}\t{name}\t{state}\t{country}\n".encode('utf-8')
+        
+        # Write to a temporary file and rename it into place, like the cache does
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(rows), HEADER.size + len(table)))
+            f.write(table)
+            f.write(records)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+def open_city_index(path: Optional[Path] = None) -> Optional['CityIndex']:
+    """Open the configured city index, or return None if it hasn't been built."""
+    path = Path(path or Config.CITY_INDEX)
+    try:
+        return CityIndex(path)
+    except (OSError, ValueError, struct.error):
+        return None
@@ -1,24 +1,74 @@
 """Command-line interface for the weather app."""
+import itertools
+import os
+import signal
+import sys
+import time
 import click
-from typing import Optional
+from typing import Optional, Iterable, Iterator, List, Tuple
 from .config import Config
-from .api import WeatherAPI
-from .display import WeatherDisplay
+from .metrics import metrics
 
 class WeatherCLI:
-    """Command-line interface for the weather app."""
+    """Command-line interface for the weather app.
+    
+    The API client and the Rich display are imported on first use so that
+    paths which don't need them (help, version, cache hits) start faster.
+    """
     
     def __init__(self):
-        self.display = WeatherDisplay()
+        self._display = None
         self.api = None
+        self.use_daemon = Config.USE_DAEMON
+        self.output = None  # Machine-readable format; None renders with Rich
+    
+    @property
+    def display(self):
+        """Rich display, created on first use."""
+        if self._display is None:
+            with metrics.timer('display.load'):
+                from .display import WeatherDisplay
+                self._display = WeatherDisplay()
+        return self._display
+    
+    def show_error(self, message: str):
+        """Report an error on the display, or on stderr for machine-readable output."""
+        if self.output:
+            click.echo(f"Error: {message}", err=True)
+        else:
+            self.display.show_error(message)
+    
+    def finish_refreshes(self):
+        """Give background cache refreshes a short deadline to finish before the process exits."""
+        wait = getattr(self.api, 'wait_for_refreshes', None)
+        if wait is not None:
+            wait(Config.REFRESH_EXIT_WAIT)
+    
+    def _daemon_client(self):
+        """Client for a running daemon, or None if there is none or it is not to be used."""
+        if self.use_daemon and (Config.DAEMON_PORT or Config.DAEMON_SOCKET.exists()):
+            from .daemon import DaemonClient
+            client = DaemonClient()
+            if client.ping():
+                return client
+        return None
     
     def _init_api(self):
         """Initialize API client with validation."""
+        if self.api is not None:
+            return
+        
+        # Forward queries to a running daemon when there is one
+        self.api = self._daemon_client()
+        if self.api is not None:
+            return
+        
         try:
             Config.validate()
+            from .api import WeatherAPI
             self.api = WeatherAPI()
         except ValueError as e:
-            self.display.show_error(str(e))
+            self.show_error(str(e))
             raise click.ClickException("Configuration error")
     
     def get_current_weather(self, city: str, units: str):
@@ -26,8 +76,9 @@ class WeatherCLI:
         self._init_api()
         
         try:
-            self.display.show_loading(f"Getting current weather for {city}...")
-            data = self.api.get_current_weather(city, units)
+            # The spinner only runs while a network request is in flight
+            with self.api.network_status(lambda: self.display.show_loading(f"Getting current weather for {city}...")):
+                data = self.api.get_current_weather(city, units)
             self.display.display_current_weather(data, units)
         
         except Exception as e:
@@ -39,19 +90,205 @@ class WeatherCLI:
         self._init_api()
         
         try:
-            self.display.show_loading(f"Getting {days}-day forecast for {city}...")
-            data = self.api.get_forecast(city, days, units)
+            with self.api.network_status(lambda: self.display.show_loading(f"Getting {days}-day forecast for {city}...")):
+                data = self.api.get_forecast(city, days, units)
             self.display.display_forecast(data, days, units)
         
         except Exception as e:
             self.display.show_error(str(e))
             raise click.ClickException("Failed to get forecast data")
+    
+    def get_many(self, cities: List[str], forecast: Optional[int], units: str, concurrency: Optional[int]):
+        """Get and display weather for several cities concurrently."""
+        self._init_api()
+        
+        if forecast:
+            message = f"Getting {forecast}-day forecast for {len(cities)} cities..."
+        else:
+            message = f"Getting current weather for {len(cities)} cities..."
+        
+        with self.display.show_loading(message):
+            if forecast:
+                results = self.api.get_forecast_many(cities, forecast, units, concurrency)
+            else:
+                results = self.api.get_current_weather_many(cities, units, concurrency)
+        
+        # Aggregate every forecast in one pass rather than once per render
+        summaries = {}
+        if forecast:
+            from .aggregate import aggregate_many
+            series = [data for _, data, error in results if error is None]
+            summaries = dict(zip(map(id, series), aggregate_many(series, limit=forecast)))
+        
+        failed = 0
+        for city, data, error in results:
+            if error is not None:
+                failed += 1
+                self.display.show_error(f"{city}: {error}")
+            elif forecast:
+                self.display.display_forecast(data, forecast, units, summaries[id(data)])
+            else:
+                self.display.display_current_weather(data, units)
+        
+        if failed:
+            raise click.ClickException(f"Failed to get weather data for {failed} of {len(results)} cities")
+    
+    def stream(self, cities: Iterable[str], forecast: Optional[int], units: str, concurrency: Optional[int]):
+        """Write machine-readable records to stdout, one per city as it completes."""
+        self._init_api()
+        
+        from .output import create_writer
+        writer = create_writer(self.output, click.get_text_stream('stdout'), forecast)
+        
+        if forecast:
+            results = self.api.iter_forecast_many(cities, forecast, units, concurrency)
+        else:
+            results = self.api.iter_current_weather_many(cities, units, concurrency)
+        
+        failed = 0
+        for city, data, error in results:
+            failed += error is not None
+            writer.write(city, data, error)
+        writer.close()
+        
+        if failed:
+            raise click.ClickException(f"Failed to get weather data for {failed} cities")
+    
+    def history(self, cities: Iterable[str], span: str, units: str):
+        """Show daily summaries of observations recorded over the last `span`, without the network."""
+        from .history import parse_span
+        try:
+            seconds = parse_span(span)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--history'")
+        
+        # A running daemon knows the city aliases it cached in memory; otherwise only the
+        # local city index, aliases and history are read, so no API key is needed
+        api = self._daemon_client()
+        if api is None:
+            from .api import WeatherAPI
+            api = WeatherAPI()
+        since = time.time() - seconds
+        
+        writer = None
+        if self.output:
+            from .output import create_writer
+            writer = create_writer(self.output, click.get_text_stream('stdout'), seconds // 86400 + 1)
+        
+        failed = 0
+        for city in cities:
+            try:
+                data, error = api.get_history(city, since, units=units), None
+            except Exception as e:
+                data, error = None, e
+            failed += error is not None
+            if writer is not None:
+                writer.write(city, data, error)
+            elif error is not None:
+                self.display.show_error(f"{city}: {error}")
+            else:
+                self.display.display_history(data, span, units)
+        if writer is not None:
+            writer.close()
+        
+        if failed:
+            raise click.ClickException(f"No history for {failed} cities")
+    
+    def serve(self, warm_cities: Optional[List[str]] = None):
+        """Run the weather daemon in the foreground, optionally keeping warm_cities fresh."""
+        try:
+            Config.validate()
+        except ValueError as e:
+            self.display.show_error(str(e))
+            raise click.ClickException("Configuration error")
+        
+        from .daemon import WeatherDaemon
+        daemon = WeatherDaemon(warm_cities=warm_cities)
+        try:
+            daemon.start()
+        except (OSError, RuntimeError) as e:
+            daemon.close()
+            self.display.show_error(f"Failed to start daemon: {e}")
+            raise click.ClickException("Daemon error")
+        
+        # Clean up the socket on `kill` as well as Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        
+        self.display.show_success(f"Weather daemon listening on {daemon.address} (Ctrl+C to stop)")
+        daemon.serve_forever()
+    
+    def warm(self, cities: List[str], refresh_ahead: bool):
+        """Prefetch current weather and forecasts for cities into the cache, once or continuously."""
+        # Warm the local cache, not a daemon's
+        self.use_daemon = False
+        self._init_api()
+        
+        from .warm import CacheWarmer
+        warmer = CacheWarmer(self.api, cities)
+        
+        def report(results):
+            for kind, city, error in results:
+                if error is not None:
+                    self.display.show_error(f"{city} ({kind}): {error}")
+        
+        try:
+            with self.display.show_loading(f"Warming cache for {len(warmer.cities)} cities..."):
+                results = warmer.warm()
+            report(results)
+            self.display.show_success(
+                f"Cache warm: {warmer.stats['refreshed']} entries fetched with {warmer.stats['calls']} calls, "
+                f"{warmer.stats['failed']} failed"
+            )
+            
+            if refresh_ahead:
+                signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+                self.display.console.print(
+                    f"Refreshing {len(warmer.items)} entries ahead of expiry (Ctrl+C to stop)", style="dim"
+                )
+                warmer.run(on_round=report)
+        finally:
+            warmer.close()
+
+def prompt_city(err: bool = False) -> str:
+    """Prompt for a city name, with Tab completion from the city index when available."""
+    from .cities import open_city_index
+    index = open_city_index()
+    try:
+        import readline
+    except ImportError:
+        readline = None
+    
+    if index is not None and readline is not None:
+        matches = []
+        
+        def complete(text: str, state: int) -> Optional[str]:
+            if state == 0:
+                matches[:] = [city.label for city in index.complete(text, limit=50)]
+            return matches[state] if state < len(matches) else None
+        
+        readline.set_completer_delims('')  # City names contain spaces
+        readline.set_completer(complete)
+        readline.parse_and_bind('tab: complete')
+    
+    return click.prompt("Enter city name", type=str, err=err)
+
+def iter_cities_file(path: str) -> Iterator[str]:
+    """Yield city names from a file, one per line (blank lines and # comments are ignored)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+def read_cities_file(path: str) -> List[str]:
+    """Read city names from a file, one per line (blank lines and # comments are ignored)."""
+    return list(iter_cities_file(path))
 
 # CLI instance
 weather_cli = WeatherCLI()
 
 @click.command()
-@click.argument('city', required=False)
+@click.argument('cities', nargs=-1)
 @click.option('--units', '-u', 
               type=click.Choice(['metric', 'imperial']), 
               default='metric',
@@ -60,11 +297,58 @@ weather_cli = WeatherCLI()
               type=int, 
               metavar='DAYS',
               help='Show forecast for specified number of days (1-5)')
+@click.option('--cities-file',
+              type=click.Path(exists=True, dir_okay=False),
+              help='Read city names from a file, one per line')
+@click.option('--concurrency', '-j',
+              type=click.IntRange(min=1),
+              default=None,
+              help=f'Maximum concurrent requests for multiple cities (default: {Config.BATCH_CONCURRENCY})')
+@click.option('--output', '-o',
+              type=click.Choice(['json', 'ndjson', 'csv']),
+              default=None,
+              help='Print machine-readable records instead of formatted output')
+@click.option('--timings',
+              is_flag=True,
+              help='Print a breakdown of where time was spent to stderr')
+@click.option('--metrics-file',
+              type=click.Path(dir_okay=False),
+              default=Config.METRICS_FILE,
+              help='Append timings and counters as a JSON line to this file')
+@click.option('--history',
+              metavar='SPAN',
+              help='Summarize weather recorded over the last SPAN (e.g. 24h, 7d, 2w) without using the network')
+@click.option('--compact-history',
+              is_flag=True,
+              help='Drop recorded history older than the retention period')
+@click.option('--serve',
+              is_flag=True,
+              help='Run a background daemon that keeps data warm for fast queries')
+@click.option('--warm',
+              type=click.Path(exists=True, dir_okay=False),
+              metavar='CITIES_FILE',
+              help='Prefetch current weather and forecasts for the cities in a file')
+@click.option('--refresh-ahead',
+              is_flag=True,
+              help='With --warm, keep refreshing those cities before their cache entries expire')
+@click.option('--no-daemon',
+              is_flag=True,
+              help='Query the API in-process even if a daemon is running')
+@click.option('--offline',
+              is_flag=True,
+              default=Config.OFFLINE,
+              help='Answer from cached and last-known data only, without using the network')
+@click.option('--build-city-index',
+              type=click.Path(exists=True, dir_okay=False),
+              metavar='CITY_LIST',
+              help='Build the offline city index from an OpenWeatherMap city.list.json(.gz) dump')
 @click.option('--clear-cache', 
               is_flag=True,
               help='Clear cached weather data')
 @click.version_option(version='1.0.0', prog_name='Weather CLI')
-def main(city: Optional[str], units: str, forecast: Optional[int], clear_cache: bool):
+def main(cities: Tuple[str, ...], units: str, forecast: Optional[int], cities_file: Optional[str],
+         concurrency: Optional[int], output: Optional[str], timings: bool, metrics_file: Optional[str],
+         history: Optional[str], compact_history: bool, serve: bool, warm: Optional[str], refresh_ahead: bool, no_daemon: bool, offline: bool, build_city_index: Optional[str], clear_cache: bool):
     """
     🌤️  Beautiful command-line weather app for Ubuntu
     
@@ -78,26 +362,120 @@ def main(city: Optional[str], units: str, forecast: Optional[int], clear_cache:
         
         weather Paris --forecast 3      # 3-day forecast for Paris
         
+        weather London Paris Tokyo      # Several cities at once
+        
+        weather --cities-file sites.txt # Cities listed in a file
+        
+        weather London Paris -o ndjson  # One JSON record per city
+        
+        weather London --history 7d     # Daily summary of the past week, offline
+        
+        weather London --offline        # Last known weather, without the network
+        
+        weather --serve                 # Keep a warm daemon for fast queries
+        
         weather --clear-cache           # Clear cached data
     
     """
-    display = WeatherDisplay()
+    if timings or metrics_file:
+        # Report once the command finishes, however it exits
+        started = time.perf_counter()
+        command = 'history' if history else 'forecast' if forecast else 'current'
+        click.get_current_context().call_on_close(
+            lambda: report_metrics(started, command, timings, metrics_file)
+        )
+    # Runs before the metrics report, so the wait counts towards wall time
+    click.get_current_context().call_on_close(weather_cli.finish_refreshes)
+    
+    if refresh_ahead and not warm:
+        raise click.UsageError("--refresh-ahead needs --warm CITIES_FILE")
+    if offline and (serve or warm):
+        raise click.UsageError("--offline can't be combined with --serve or --warm")
+    
+    if serve:
+        try:
+            weather_cli.serve(read_cities_file(warm) if warm else None)
+        except click.ClickException:
+            pass
+        except KeyboardInterrupt:
+            weather_cli.display.console.print("\n👋 Goodbye!", style="bold yellow")
+        return
+    
+    if no_daemon:
+        weather_cli.use_daemon = False
+    if offline:
+        # A daemon would use the network on our behalf
+        Config.OFFLINE = True
+        weather_cli.use_daemon = False
+    
+    if build_city_index:
+        try:
+            from .cities import CityIndex
+            index = CityIndex.build(build_city_index)
+            weather_cli.display.show_success(f"Indexed {len(index)} cities into {index.path}")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            weather_cli.display.show_error(f"Failed to build city index: {e}")
+        return
+    
+    if compact_history:
+        from .history import HistoryStore
+        try:
+            files, removed = HistoryStore().compact()
+            weather_cli.display.show_success(f"Compacted {files} history files, removed {removed} old records")
+        except OSError as e:
+            weather_cli.display.show_error(f"Failed to compact history: {e}")
+        return
+    
+    if history:
+        weather_cli.output = output
+        cities = list(cities)
+        if cities_file:
+            cities.extend(read_cities_file(cities_file))
+        if not cities:
+            cities = [prompt_city(err=bool(output))]
+        try:
+            weather_cli.history(cities, history, units)
+        except click.UsageError:
+            raise
+        except click.ClickException as e:
+            # Errors were already shown, except in machine-readable mode
+            if output:
+                e.show()
+                sys.exit(1)
+        return
     
     # Handle cache clearing
     if clear_cache:
         try:
-            from .cache import WeatherCache
-            cache = WeatherCache()
+            from .cache import create_cache
+            cache = create_cache()
             cache.clear()
-            display.show_success("Weather cache cleared successfully!")
+            weather_cli.display.show_success("Weather cache cleared successfully!")
             return
         except Exception as e:
-            display.show_error(f"Failed to clear cache: {e}")
+            weather_cli.display.show_error(f"Failed to clear cache: {e}")
             return
     
-    # Get city name
-    if not city:
-        city = click.prompt("Enter city name", type=str)
+    if warm:
+        try:
+            weather_cli.warm(read_cities_file(warm), refresh_ahead)
+        except KeyboardInterrupt:
+            weather_cli.display.console.print("\n👋 Goodbye!", style="bold yellow")
+        return
+    
+    if output:
+        weather_cli.output = output
+        run_machine_output(cities, cities_file, forecast, units, concurrency)
+        return
+    
+    display = weather_cli.display
+    
+    # Get city names
+    cities = list(cities)
+    if cities_file:
+        cities.extend(read_cities_file(cities_file))
+    if not cities:
+        cities = [prompt_city()]
     
     # Validate forecast days
     if forecast is not None:
@@ -106,10 +484,12 @@ def main(city: Optional[str], units: str, forecast: Optional[int], clear_cache:
             return
     
     try:
-        if forecast:
-            weather_cli.get_forecast(city, forecast, units)
+        if len(cities) > 1:
+            weather_cli.get_many(cities, forecast, units, concurrency)
+        elif forecast:
+            weather_cli.get_forecast(cities[0], forecast, units)
         else:
-            weather_cli.get_current_weather(city, units)
+            weather_cli.get_current_weather(cities[0], units)
     
     except click.ClickException:
         # Error already displayed by the CLI methods
@@ -119,5 +499,52 @@ def main(city: Optional[str], units: str, forecast: Optional[int], clear_cache:
     except Exception as e:
         display.show_error(f"Unexpected error: {e}")
 
+def report_metrics(started: float, command: str, timings: bool, metrics_file: Optional[str]):
+    """Print the --timings breakdown and/or append the metrics record to a file."""
+    from .metrics import append_metrics, format_report
+    
+    wall_ms = (time.perf_counter() - started) * 1000
+    # Cache footprint, when this process used the cache itself rather than a daemon. Measuring
+    # it touches every entry, so only interactive --timings pays for it, not a metrics file
+    cache = getattr(weather_cli.api, 'cache', None)
+    usage = cache.disk_usage() if timings and cache is not None else None
+    if usage is not None:
+        metrics.incr('cache.disk_entries', usage[0])
+        metrics.incr('cache.disk_bytes', usage[1])
+    snapshot = metrics.snapshot()
+    
+    if timings:
+        click.echo(format_report(snapshot, wall_ms), err=True)
+    if metrics_file:
+        from .codec import NAME as codec_name
+        try:
+            append_metrics(metrics_file, dict(snapshot, command=command, codec=codec_name,
+                                              wall_ms=round(wall_ms, 3)))
+        except OSError as e:
+            click.echo(f"Warning: could not write metrics to {metrics_file}: {e}", err=True)
+
+def run_machine_output(cities: Tuple[str, ...], cities_file: Optional[str], forecast: Optional[int],
+                       units: str, concurrency: Optional[int]):
+    """--output mode: stream records to stdout without loading Rich; failures set the exit status."""
+    if forecast is not None and (forecast < 1 or forecast > 5):
+        raise click.BadParameter("Forecast days must be between 1 and 5", param_hint="'--forecast'")
+    
+    # Cities from a file are read lazily so long lists stream through
+    all_cities = itertools.chain(cities, iter_cities_file(cities_file) if cities_file else ())
+    if not cities and not cities_file:
+        all_cities = [prompt_city(err=True)]
+    
+    try:
+        weather_cli.stream(all_cities, forecast, units, concurrency)
+    except click.ClickException as e:
+        e.show()
+        sys.exit(e.exit_code)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); silence the final flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""JSON encoding shared by the API client, the cache backends and the daemon.
+
+Uses orjson when it is installed and the standard library otherwise; both
+produce compact UTF-8 bytes. Cache entries larger than COMPRESS_MIN_BYTES
+are zlib-compressed when Config.CACHE_COMPRESS is set, and decoding accepts
+compressed and plain entries alike (including the indented files written
+by older versions).
+"""
+import json
+import zlib
+from typing import Any, Union
+from .config import Config
+from .metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+NAME = 'orjson' if orjson is not None else 'json'
+
+# Raised by loads/decode_entry for corrupt input
+DECODE_ERRORS = (ValueError, zlib.error)
+
+COMPRESS_MIN_BYTES = 512  # Smaller entries don't shrink enough to be worth it
+ZLIB_LEVEL = 6
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON as UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON from bytes or text."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def encode_entry(value: Any) -> bytes:
+    """Serialized form of a cache entry, compressed if large enough."""
+    with metrics.timer('codec.encode'):
+        data = dumps(value)
+        if Config.CACHE_COMPRESS and len(data) >= COMPRESS_MIN_BYTES:
+            data = zlib.compress(data, ZLIB_LEVEL)
+    return data
+
+def decode_entry(data: Union[bytes, str]) -> Any:
+    """Inverse of encode_entry."""
+    with metrics.timer('codec.decode'):
+        # A zlib stream starts with 0x78, which JSON never does
+        if isinstance(data, bytes) and data[:1] == b'\x78':
+            data = zlib.decompress(data)
+        return loads(data)
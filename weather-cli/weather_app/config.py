@@ -1,21 +1,112 @@
 """Configuration management for the weather app."""
 import os
 from pathlib import Path
-from dotenv import load_dotenv
+from .metrics import metrics
 
 # Load environment variables
-load_dotenv()
+with metrics.timer('config.load'):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 class Config:
     """Configuration class for the weather app."""
     
     # API Configuration
     API_KEY = os.getenv('OPENWEATHER_API_KEY')
-    BASE_URL = 'http://api.openweathermap.org/data/2.5'
+    BASE_URL = os.getenv('WEATHER_BASE_URL', 'http://api.openweathermap.org/data/2.5')
+    
+    # HTTP Settings
+    REQUEST_TIMEOUT = float(os.getenv('WEATHER_REQUEST_TIMEOUT', '10'))
+    HTTP_POOL_SIZE = int(os.getenv('WEATHER_HTTP_POOL_SIZE', '10'))
+    MAX_RETRIES = int(os.getenv('WEATHER_MAX_RETRIES', '3'))
+    BACKOFF_BASE = float(os.getenv('WEATHER_BACKOFF_BASE', '0.5'))  # seconds
+    BACKOFF_MAX = float(os.getenv('WEATHER_BACKOFF_MAX', '8'))  # seconds
+    
+    # AsyncWeatherAPI: HTTP client ('auto' picks httpx, then aiohttp, then the
+    # built-in one) and threads for cache and history I/O
+    ASYNC_HTTP = os.getenv('WEATHER_ASYNC_HTTP', 'auto')  # 'auto', 'httpx', 'aiohttp' or 'builtin'
+    ASYNC_IO_THREADS = int(os.getenv('WEATHER_ASYNC_IO_THREADS', '4'))
+    
+    # Client-side Rate Limit (0 disables)
+    RATE_LIMIT = float(os.getenv('WEATHER_RATE_LIMIT', '60'))  # calls per minute
+    RATE_LIMIT_BURST = int(os.getenv('WEATHER_RATE_LIMIT_BURST', '10'))
+    
+    # Circuit Breaker
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv('WEATHER_BREAKER_THRESHOLD', '5'))
+    BREAKER_RESET_TIMEOUT = float(os.getenv('WEATHER_BREAKER_RESET', '30'))  # seconds
     
     # Cache Configuration
-    CACHE_DIR = Path.home() / '.weather_cache'
-    CACHE_DURATION = 600  # 10 minutes in seconds
+    CACHE_DIR = Path(os.getenv('WEATHER_CACHE_DIR', Path.home() / '.weather_cache'))
+    CACHE_DURATION = 600  # 10 minutes in seconds, for entries without a data-derived expiry
+    CACHE_MAX_STALE = int(os.getenv('WEATHER_CACHE_MAX_STALE', '600'))  # Serve-while-refreshing window
+    REFRESH_EXIT_WAIT = float(os.getenv('WEATHER_REFRESH_EXIT_WAIT', '0.5'))  # CLI wait for background refreshes
+    NEGATIVE_CACHE_DURATION = int(os.getenv('WEATHER_NEGATIVE_CACHE_DURATION', '60'))  # "City not found" answers
+    CACHE_BACKEND = os.getenv('WEATHER_CACHE_BACKEND', 'file')  # 'file', 'sqlite' or 'memory'
+    CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_CACHE_MAX_ENTRIES', '10000'))  # sqlite only, 0 = unbounded
+    
+    CACHE_COMPRESS = os.getenv('WEATHER_CACHE_COMPRESS', '1').lower() not in ('0', 'false', 'no')  # zlib for large entries
+    
+    # Degraded mode: weather data past its stale window is kept in the cache's
+    # fallback area until this many seconds after it was fetched (0 disables),
+    # and served, marked with its age, when fresh data can't be fetched. While
+    # a fallback copy exists, requests give up after FALLBACK_TIMEOUT seconds
+    # without retrying. OFFLINE (--offline) never uses the network.
+    FALLBACK_MAX_AGE = int(os.getenv('WEATHER_FALLBACK_MAX_AGE', str(24 * 3600)))
+    FALLBACK_TIMEOUT = float(os.getenv('WEATHER_FALLBACK_TIMEOUT', '3'))
+    OFFLINE = os.getenv('WEATHER_OFFLINE', '').lower() in ('1', 'true', 'yes')
+    
+    # In-memory tier in front of the file/sqlite cache (0 entries disables it)
+    MEMORY_CACHE_ENTRIES = int(os.getenv('WEATHER_MEMORY_CACHE_ENTRIES', '1000'))
+    MEMORY_CACHE_BYTES = int(os.getenv('WEATHER_MEMORY_CACHE_BYTES', str(16 * 1024 * 1024)))
+    MEMORY_CACHE_TTL = float(os.getenv('WEATHER_MEMORY_CACHE_TTL', '60'))  # Re-read disk after this long
+    
+    # Adaptive TTLs: weather data expires when the provider next updates it
+    # (observation `dt` plus the update interval, or the next forecast slot),
+    # clamped to these floors and ceilings in seconds
+    CURRENT_UPDATE_INTERVAL = int(os.getenv('WEATHER_CURRENT_UPDATE_INTERVAL', '600'))
+    CURRENT_TTL_MIN = int(os.getenv('WEATHER_CURRENT_TTL_MIN', '60'))
+    CURRENT_TTL_MAX = int(os.getenv('WEATHER_CURRENT_TTL_MAX', '600'))
+    FORECAST_UPDATE_INTERVAL = int(os.getenv('WEATHER_FORECAST_UPDATE_INTERVAL', str(3 * 3600)))
+    FORECAST_TTL_MIN = int(os.getenv('WEATHER_FORECAST_TTL_MIN', '600'))
+    FORECAST_TTL_MAX = int(os.getenv('WEATHER_FORECAST_TTL_MAX', str(3 * 3600)))
+    
+    # Observation History (--history): every fetched observation and forecast
+    # is appended to per-city files, kept for the retention period in days
+    HISTORY = os.getenv('WEATHER_HISTORY', '1').lower() not in ('0', 'false', 'no')
+    HISTORY_DIR = Path(os.getenv('WEATHER_HISTORY_DIR', CACHE_DIR / 'history'))
+    HISTORY_RETENTION_DAYS = float(os.getenv('WEATHER_HISTORY_RETENTION_DAYS', '365'))
+    HISTORY_FORECAST_RETENTION_DAYS = float(os.getenv('WEATHER_HISTORY_FORECAST_RETENTION_DAYS', '30'))
+    
+    # City Resolution: offline index built with --build-city-index, and how long
+    # names resolved by the API itself are remembered
+    CITY_INDEX = Path(os.getenv('WEATHER_CITY_INDEX', CACHE_DIR / 'cities.idx'))
+    ALIAS_CACHE_DURATION = int(os.getenv('WEATHER_ALIAS_CACHE_DURATION', str(30 * 24 * 3600)))
+    
+    # Answer current-weather requests from a fresh cached forecast
+    CURRENT_FROM_FORECAST = os.getenv('WEATHER_CURRENT_FROM_FORECAST', '').lower() in ('1', 'true', 'yes')
+    
+    # Batch Settings
+    BATCH_CONCURRENCY = int(os.getenv('WEATHER_CONCURRENCY', '8'))
+    # Multi-city current weather: cities with known IDs are fetched up to GROUP_SIZE
+    # per `group` call (0 disables), waiting at most GROUP_WINDOW seconds to fill a call
+    GROUP_SIZE = min(int(os.getenv('WEATHER_GROUP_SIZE', '20')), 20)  # API maximum is 20
+    GROUP_WINDOW = float(os.getenv('WEATHER_GROUP_WINDOW', '0.05'))
+    
+    # Cache Warming (--warm / --refresh-ahead)
+    WARM_BUDGET = float(os.getenv('WEATHER_WARM_BUDGET', '30'))  # Upstream calls per minute
+    REFRESH_AHEAD = float(os.getenv('WEATHER_REFRESH_AHEAD', '60'))  # Seconds before expiry to refresh
+    REFRESH_SPREAD = float(os.getenv('WEATHER_REFRESH_SPREAD', '60'))  # Random extra lead, spreads refreshes
+    
+    # Daemon Settings (a TCP port on localhost is used instead of the socket when set)
+    DAEMON_SOCKET = Path(os.getenv('WEATHER_DAEMON_SOCKET', CACHE_DIR / 'weatherd.sock'))
+    DAEMON_PORT = int(os.getenv('WEATHER_DAEMON_PORT', '0')) or None
+    DAEMON_TIMEOUT = float(os.getenv('WEATHER_DAEMON_TIMEOUT', '30'))  # seconds per query
+    DAEMON_CACHE_ENTRIES = int(os.getenv('WEATHER_DAEMON_CACHE_ENTRIES', '10000'))
+    DAEMON_CACHE_BYTES = int(os.getenv('WEATHER_DAEMON_CACHE_BYTES', str(64 * 1024 * 1024)))
+    USE_DAEMON = os.getenv('WEATHER_USE_DAEMON', '1').lower() not in ('0', 'false', 'no')
+    
+    # Append per-invocation metrics as JSON lines to this file
+    METRICS_FILE = os.getenv('WEATHER_METRICS_FILE')
     
     # Default Settings
     DEFAULT_UNITS = 'metric'
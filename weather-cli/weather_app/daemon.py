@@ -0,0 +1,232 @@
+"""Long-running weather daemon and the thin client that queries it.
+
+The daemon keeps a warm WeatherAPI (pooled connections, in-memory cache)
+and answers newline-delimited JSON queries on a Unix domain socket, or on a
+localhost TCP port when Config.DAEMON_PORT is set. Each connection carries
+one request and one response:
+
+    -> {"op": "current", "city": "London", "units": "metric"}
+    -> {"op": "history", "city": "London", "since": 1700000000, "until": null, "units": "metric"}
+    <- {"ok": true, "data": [...]}          (model in its compact cache form)
+    <- {"ok": true, "data": [...], "stale_age": 7260}   (last-known data, in seconds)
+    <- {"ok": false, "error": "City not found...", "type": "CityNotFoundError"}
+"""
+import os
+import socket
+import socketserver
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Type, Union
+from . import codec, errors
+from .batch import BatchMixin
+from .config import Config
+from .metrics import metrics
+from .models import CurrentObservation, ForecastSeries
+
+class DaemonUnavailableError(Exception):
+    """No daemon is listening."""
+
+def _use_tcp() -> bool:
+    return Config.DAEMON_PORT is not None or not hasattr(socket, 'AF_UNIX')
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle one JSON request per connection."""
+    
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        
+        try:
+            response = dict(self.server.weather_daemon.dispatch(codec.loads(line)), ok=True)
+        except Exception as e:
+            response = {'ok': False, 'error': str(e), 'type': type(e).__name__}
+        
+        self.wfile.write(codec.dumps(response) + b'\n')
+
+def _model_response(value: Union[CurrentObservation, ForecastSeries]) -> Dict[str, Any]:
+    response = {'data': value.to_cache()}
+    if value.stale_age is not None:
+        response['stale_age'] = value.stale_age
+    return response
+
+def _response_model(model: Type[Any], response: Dict[str, Any]) -> Any:
+    value = model.from_cache(response['data'])
+    value.stale_age = response.get('stale_age')
+    return value
+
+class WeatherDaemon:
+    """Serve weather queries from a warm in-process WeatherAPI."""
+    
+    def __init__(self, api=None, warm_cities: Optional[List[str]] = None):
+        if api is None:
+            from .api import WeatherAPI
+            from .cache import MemoryCache
+            api = WeatherAPI(cache=MemoryCache())
+        self.api = api
+        self.server = None
+        self.warmer = None
+        if warm_cities:
+            # Keep these cities fresh in the daemon's own cache
+            from .warm import CacheWarmer
+            self.warmer = CacheWarmer(api, warm_cities)
+    
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one query against the API, returning the fields of a successful response."""
+        op = request.get('op')
+        units = request.get('units', Config.DEFAULT_UNITS)
+        
+        if op == 'ping':
+            return {'data': 'pong'}
+        if op == 'current':
+            return _model_response(self.api.get_current_weather(request['city'], units))
+        if op == 'forecast':
+            return _model_response(self.api.get_forecast(request['city'], int(request.get('days', 5)), units))
+        if op == 'history':
+            # City names may resolve through aliases only this daemon has cached
+            until = request.get('until')
+            return _model_response(self.api.get_history(
+                request['city'], float(request['since']), float(until) if until is not None else None, units
+            ))
+        raise ValueError(f"Unknown operation: {op!r}")
+    
+    def _bind(self) -> socketserver.BaseServer:
+        if _use_tcp():
+            if Config.DAEMON_PORT is None:
+                raise RuntimeError("Unix sockets are not available; set WEATHER_DAEMON_PORT")
+            server = socketserver.ThreadingTCPServer(('127.0.0.1', Config.DAEMON_PORT), _RequestHandler,
+                                                     bind_and_activate=False)
+            server.allow_reuse_address = True
+            server.server_bind()
+            server.server_activate()
+            return server
+        
+        path = Config.DAEMON_SOCKET
+        if path.exists():
+            if DaemonClient().ping():
+                raise RuntimeError(f"A weather daemon is already running on {path}")
+            path.unlink()  # Left behind by a daemon that didn't shut down cleanly
+        path.parent.mkdir(parents=True, exist_ok=True)
+        server = socketserver.ThreadingUnixStreamServer(str(path), _RequestHandler)
+        os.chmod(path, 0o600)
+        return server
+    
+    @property
+    def address(self) -> str:
+        """Human-readable listening address."""
+        if isinstance(self.server.server_address, tuple):
+            host, port = self.server.server_address[:2]
+            return f"{host}:{port}"
+        return str(self.server.server_address)
+    
+    def start(self):
+        """Bind the listening socket."""
+        self.server = self._bind()
+        self.server.daemon_threads = True
+        self.server.weather_daemon = self
+        if self.warmer is not None:
+            threading.Thread(target=self.warmer.run, name='weather-warmer', daemon=True).start()
+    
+    def serve_forever(self):
+        """Serve until interrupted, then clean up the socket."""
+        if self.server is None:
+            self.start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+    
+    def close(self):
+        """Close the listening socket and pooled connections."""
+        if self.server is not None:
+            self.server.server_close()
+            if not _use_tcp():
+                try:
+                    Config.DAEMON_SOCKET.unlink()
+                except FileNotFoundError:
+                    pass
+            self.server = None
+        if self.warmer is not None:
+            self.warmer.close()
+        self.api.close()
+
+class DaemonClient(BatchMixin):
+    """Thin client with the WeatherAPI query surface, forwarding to the daemon."""
+    
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout if timeout is not None else Config.DAEMON_TIMEOUT
+    
+    def _connect(self) -> socket.socket:
+        try:
+            if _use_tcp():
+                if Config.DAEMON_PORT is None:
+                    raise DaemonUnavailableError("No daemon port configured")
+                return socket.create_connection(('127.0.0.1', Config.DAEMON_PORT), timeout=self.timeout)
+            
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(str(Config.DAEMON_SOCKET))
+            except OSError:
+                sock.close()
+                raise
+            return sock
+        except OSError as e:
+            raise DaemonUnavailableError(f"Weather daemon is not running: {e}")
+    
+    def _request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # Cache and network work happens in the daemon; only the round trip is timed here
+        metrics.incr('daemon.queries')
+        with metrics.timer('daemon'), self._connect() as sock:
+            try:
+                sock.sendall(codec.dumps(request) + b'\n')
+                with sock.makefile('rb') as reader:
+                    line = reader.readline()
+            except OSError as e:
+                raise DaemonUnavailableError(f"Lost connection to weather daemon: {e}")
+        
+        if not line:
+            raise DaemonUnavailableError("Weather daemon closed the connection")
+        
+        response = codec.loads(line)
+        if response['ok']:
+            return response
+        
+        # Re-raise as the same error type the in-process API would raise
+        error_type = getattr(errors, response.get('type', ''), None)
+        if not (isinstance(error_type, type) and issubclass(error_type, errors.WeatherAPIError)):
+            error_type = errors.WeatherAPIError
+        raise error_type(response['error'])
+    
+    def ping(self) -> bool:
+        """Check whether a daemon is answering."""
+        try:
+            return self._request({'op': 'ping'}).get('data') == 'pong'
+        except (DaemonUnavailableError, ValueError):
+            return False
+    
+    @contextmanager
+    def network_status(self, status):
+        """No-op: network I/O happens in the daemon."""
+        yield
+    
+    def close(self):
+        """Nothing to release; each query uses its own connection."""
+    
+    def get_current_weather(self, city: str, units: str = 'metric') -> CurrentObservation:
+        """Get current weather for a city from the daemon."""
+        return _response_model(CurrentObservation, self._request({'op': 'current', 'city': city, 'units': units}))
+    
+    def get_forecast(self, city: str, days: int = 5, units: str = 'metric') -> ForecastSeries:
+        """Get weather forecast for a city from the daemon."""
+        return _response_model(
+            ForecastSeries, self._request({'op': 'forecast', 'city': city, 'days': days, 'units': units})
+        )
+    
+    def get_history(self, city: str, since: float, until: Optional[float] = None,
+                    units: str = 'metric') -> ForecastSeries:
+        """Get recorded observations for a city from the daemon."""
+        return _response_model(
+            ForecastSeries,
+            self._request({'op': 'history', 'city': city, 'since': since, 'until': until, 'units': units})
+        )
@@ -1,7 +1,7 @@
 """Rich-based display formatting for weather data."""
-from typing import Dict, Any, List
-from datetime import datetime
 import time
+from typing import Dict, List, Optional
+from datetime import date, datetime
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -9,6 +9,23 @@ from rich.columns import Columns
 from rich.text import Text
 from rich.align import Align
 from rich import box
+from .aggregate import ForecastSummary, aggregate, local_date, relative_day_label
+from .metrics import timed
+from .models import CurrentObservation, ForecastSeries
+
+def format_age(seconds: float) -> str:
+    """Compact age such as '45s', '12m' or '2h 5m'."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes = seconds // 60
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m" if minutes else f"{hours}h"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h" if hours else f"{days}d"
 
 class WeatherDisplay:
     """Weather data display using Rich."""
@@ -75,20 +92,27 @@ class WeatherDisplay:
                 'pressure': 'hPa'
             }
     
-    def display_current_weather(self, data: Dict[str, Any], units: str = 'metric'):
+    def _stale_subtitle(self, stale_age: Optional[int]) -> Optional[str]:
+        """Panel subtitle warning that last-known data is shown, if it is."""
+        if stale_age is None:
+            return None
+        return f"[bold yellow]⚠ Last known data from {format_age(stale_age)} ago[/bold yellow]"
+    
+    @timed('render')
+    def display_current_weather(self, data: CurrentObservation, units: str = 'metric'):
         """Display current weather data."""
         unit_symbols = self.format_units(units)
         
         # Extract data
-        city = data['name']
-        country = data['sys']['country']
-        description = data['weather'][0]['description']
-        temp = data['main']['temp']
-        feels_like = data['main']['feels_like']
-        humidity = data['main']['humidity']
-        pressure = data['main']['pressure']
-        wind_speed = data.get('wind', {}).get('speed', 0)
-        wind_dir = data.get('wind', {}).get('deg', 0)
+        city = data.city
+        country = data.country
+        description = data.description
+        temp = data.temp
+        feels_like = data.feels_like
+        humidity = data.humidity
+        pressure = data.pressure
+        wind_speed = data.wind_speed
+        wind_dir = data.wind_deg
         
         # Get weather icon and temperature color
         icon = self.get_weather_icon(description)
@@ -105,6 +129,7 @@ class WeatherDisplay:
             Align.center(weather_info),
             title=f"[bold cyan]{city}, {country}[/bold cyan]",
             title_align="center",
+            subtitle=self._stale_subtitle(data.stale_age),
             box=box.ROUNDED,
             padding=(1, 2)
         )
@@ -143,50 +168,24 @@ class WeatherDisplay:
         self.console.print(Columns([details_panel, time_panel], equal=True))
         self.console.print()
     
-    def display_forecast(self, data: Dict[str, Any], days: int, units: str = 'metric'):
-        """Display weather forecast."""
+    def _summary_table(self, summaries: List[ForecastSummary], units: str, today: date) -> Table:
+        """Table with one row per daily summary."""
         unit_symbols = self.format_units(units)
         
-        city = data['city']['name']
-        country = data['city']['country']
-        forecast_list = data['list']
-        
-        # Group forecast by day
-        daily_forecasts = {}
-        for item in forecast_list[:days * 8]:  # Limit to requested days
-            date = datetime.fromtimestamp(item['dt']).date()
-            if date not in daily_forecasts:
-                daily_forecasts[date] = []
-            daily_forecasts[date].append(item)
-        
-        # Create forecast table
-        forecast_table = Table(box=box.ROUNDED, show_lines=True)
-        forecast_table.add_column("Date", style="bold cyan", justify="center")
-        forecast_table.add_column("Weather", justify="center")
-        forecast_table.add_column("High/Low", style="bold", justify="center")
-        forecast_table.add_column("Details", justify="left")
-        
-        for date, day_data in list(daily_forecasts.items())[:days]:
-            # Get min/max temperatures for the day
-            temps = [item['main']['temp'] for item in day_data]
-            min_temp = min(temps)
-            max_temp = max(temps)
-            
-            # Get most common weather condition
-            weather_desc = day_data[len(day_data)//2]['weather'][0]['description']
+        table = Table(box=box.ROUNDED, show_lines=True)
+        table.add_column("Date", style="bold cyan", justify="center")
+        table.add_column("Weather", justify="center")
+        table.add_column("High/Low", style="bold", justify="center")
+        table.add_column("Details", justify="left")
+        
+        for summary in summaries:
+            min_temp = summary.temp_min
+            max_temp = summary.temp_max
+            weather_desc = summary.condition
             icon = self.get_weather_icon(weather_desc)
-            
-            # Get average humidity and wind
-            avg_humidity = sum(item['main']['humidity'] for item in day_data) // len(day_data)
-            avg_wind = sum(item.get('wind', {}).get('speed', 0) for item in day_data) / len(day_data)
-            
-            # Format date
-            if date == datetime.now().date():
-                date_str = "Today"
-            elif date == datetime.now().date().replace(day=datetime.now().date().day + 1):
-                date_str = "Tomorrow"
-            else:
-                date_str = date.strftime("%m/%d")
+            avg_humidity = summary.humidity_mean
+            avg_wind = summary.wind_mean
+            date_str = relative_day_label(summary.date, today)
             
             # Temperature colors
             high_color = self.get_temperature_color(max_temp, units)
@@ -202,20 +201,39 @@ class WeatherDisplay:
             weather_col.append(weather_desc.title())
             
             details_col = Text()
-            details_col.append(f"💧 {avg_humidity}%  ", style="dim")
+            details_col.append(f"💧 {avg_humidity:.0f}%  ", style="dim")
             details_col.append(f"🌬️ {avg_wind:.1f}{unit_symbols['speed']}", style="dim")
             
-            forecast_table.add_row(
+            table.add_row(
                 date_str,
                 weather_col,
                 high_low,
                 details_col
             )
         
+        return table
+    
+    @timed('render')
+    def display_forecast(self, data: ForecastSeries, days: int, units: str = 'metric',
+                         summaries: Optional[List[ForecastSummary]] = None):
+        """Display weather forecast.
+        
+        `summaries` are the daily aggregates of `data`; pass them when they
+        were already computed (e.g. for a batch of cities) to skip aggregation.
+        """
+        city = data.city
+        country = data.country
+        
+        if summaries is None:
+            summaries = aggregate(data, limit=days)
+        today = local_date(time.time(), data.timezone)
+        forecast_table = self._summary_table(summaries[:days], units, today)
+        
         # Display forecast
         forecast_panel = Panel(
             forecast_table,
             title=f"[bold cyan]{days}-Day Forecast for {city}, {country}[/bold cyan]",
+            subtitle=self._stale_subtitle(data.stale_age),
             box=box.ROUNDED
         )
         
@@ -223,13 +241,28 @@ class WeatherDisplay:
         self.console.print(forecast_panel)
         self.console.print()
     
-    def show_loading(self, message: str = "Fetching weather data..."):
-        """Show loading spinner."""
-        import time
-        from rich.spinner import Spinner
+    @timed('render')
+    def display_history(self, data: ForecastSeries, span: str, units: str = 'metric',
+                        summaries: Optional[List[ForecastSummary]] = None):
+        """Display daily summaries of recorded observations over the last `span` (e.g. '7d')."""
+        if summaries is None:
+            summaries = aggregate(data)
+        today = local_date(time.time(), data.timezone)
+        
+        history_panel = Panel(
+            self._summary_table(summaries, units, today),
+            title=f"[bold cyan]Last {span} for {data.city}, {data.country}[/bold cyan]",
+            subtitle=f"[dim]{len(data)} recorded observation{'s' if len(data) != 1 else ''}[/dim]",
+            box=box.ROUNDED
+        )
         
-        with self.console.status(f"[bold cyan]{message}[/bold cyan]", spinner="dots"):
-            time.sleep(0.5)  # Brief pause for visual feedback
+        self.console.print()
+        self.console.print(history_panel)
+        self.console.print()
+    
+    def show_loading(self, message: str = "Fetching weather data..."):
+        """Return a loading spinner context manager, shown while the block runs."""
+        return self.console.status(f"[bold cyan]{message}[/bold cyan]", spinner="dots")
     
     def show_error(self, error_message: str):
         """Display error message."""
@@ -0,0 +1,22 @@
+"""Exception types raised by the weather API client."""
+
+class WeatherAPIError(Exception):
+    """Base class for weather service errors."""
+
+class CityNotFoundError(WeatherAPIError):
+    """The requested city does not exist upstream."""
+
+class ServiceUnavailableError(WeatherAPIError):
+    """The weather service could not be reached or kept failing after retries."""
+
+class CircuitOpenError(ServiceUnavailableError):
+    """Requests are short-circuited because the weather service is failing."""
+
+class OfflineError(ServiceUnavailableError):
+    """Offline mode, and nothing usable is cached for the request."""
+
+class NoHistoryError(WeatherAPIError):
+    """Nothing was recorded for the city in the requested period."""
+
+class DeadlineExceededError(ServiceUnavailableError):
+    """An async lookup did not finish within its deadline."""
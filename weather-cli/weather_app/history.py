@@ -0,0 +1,346 @@
+"""Append-only on-disk history of observations and forecasts per city.
+
+Every observation and forecast fetched by WeatherAPI is appended to small
+binary files, one per city and kind, so trends can be queried later without
+the network and without parsing JSON. Records have a fixed size and are
+kept in time order, so the files are memory-mapped and a range query is a
+binary search followed by one struct unpack over the matching bytes.
+
+File layout (little-endian), `<city id>.obs` and `<city id>.fc`:
+
+    header   magic, int32 timezone, 2-byte country, 48-byte UTF-8 city name
+    records  observation: int64 dt, int16 temp and feels_like (centidegrees C),
+             uint16 wind speed (cm/s), pressure, wind direction and condition
+             code, uint8 humidity; forecast slots are prefixed with the int64
+             time the forecast was fetched
+
+Condition texts are shared by all cities in `conditions.txt` and referenced
+by line number. Records older than the retention period are dropped by
+compaction, which rewrites a file once its oldest record is a day overdue.
+"""
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from .aggregate import _load_numpy
+from .config import Config
+from .models import CurrentObservation, ForecastSeries
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent writers are not serialized
+    fcntl = None
+
+# Fields dt, temp, feels_like, wind_speed, pressure, wind_deg, condition, humidity
+COLUMN_TYPES = 'qhhHHHHB'
+
+HEADER = struct.Struct('<8si2s2x48s')
+OBSERVATION = struct.Struct(f'<{COLUMN_TYPES}x')
+FORECAST = struct.Struct(f'<q{COLUMN_TYPES}x')  # Prefixed with the fetch time
+KEY = struct.Struct('<q')  # Leading sort key of every record
+
+# kind -> (file suffix, magic, record format)
+KINDS = {
+    'obs': ('.obs', b'WHOBS1\0\0', OBSERVATION),
+    'fc': ('.fc', b'WHFC1\0\0\0', FORECAST)
+}
+
+COMPACT_SLACK = 24 * 3600  # How far past retention the oldest record may be before compacting
+
+SPAN_UNITS = {'h': 3600, 'd': 24 * 3600, 'w': 7 * 24 * 3600}
+
+def parse_span(text: str) -> int:
+    """Seconds in a span like '12h', '7d' or '2w'."""
+    match = re.fullmatch(r'\s*(\d+)\s*([hdw])\s*', text.lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid time span {text!r}; use e.g. 24h, 7d or 2w")
+    return int(match.group(1)) * SPAN_UNITS[match.group(2)]
+
+def _centi(value: float) -> int:
+    return int(round(value * 100))
+
+def _array(typecode: str, values: Sequence, scale: int = 1) -> array:
+    """Typed array from a decoded column (a tuple, or a NumPy array when installed)."""
+    if hasattr(values, 'astype'):
+        result = array(typecode)
+        result.frombytes((values / scale if scale != 1 else values).astype(typecode).tobytes())
+        return result
+    return array(typecode, [value / scale for value in values] if scale != 1 else values)
+
+@contextmanager
+def _locked(path: Path) -> Iterator[int]:
+    """Open path for writing and hold an exclusive lock on it."""
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            break
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        # Compacted and replaced while we waited; lock the new file instead
+        os.close(fd)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+class HistoryStore:
+    """Per-city observation and forecast history under Config.HISTORY_DIR."""
+    
+    def __init__(self, path: Optional[Path] = None, retention_days: Optional[float] = None,
+                 forecast_retention_days: Optional[float] = None):
+        self.path = Path(path or Config.HISTORY_DIR)
+        self.retention = {
+            'obs': (retention_days if retention_days is not None else Config.HISTORY_RETENTION_DAYS) * 86400,
+            'fc': (forecast_retention_days if forecast_retention_days is not None
+                   else Config.HISTORY_FORECAST_RETENTION_DAYS) * 86400
+        }
+        self._conditions: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def _file(self, key: str, kind: str) -> Path:
+        """History file of a canonical city key ('#<id>' or a normalized name)."""
+        stem = key[1:] if key.startswith('#') else 'q-' + key.replace(' ', '_').replace(',', '.').replace('/', '_')
+        return self.path / f"{stem}{KINDS[kind][0]}"
+    
+    def _load_conditions(self):
+        """Reload the shared condition table (caller holds self._lock)."""
+        try:
+            lines = (self.path / 'conditions.txt').read_text(encoding='utf-8').split('\n')[:-1]
+        except FileNotFoundError:
+            lines = []
+        self._conditions = lines
+        self._codes = {}
+        for code, text in enumerate(lines):
+            self._codes.setdefault(text, code)
+    
+    def _condition_code(self, text: str) -> int:
+        """Code of a condition text, adding it to the shared table if it is new."""
+        text = ' '.join(text.split())
+        with self._lock:
+            if text not in self._codes:
+                self._load_conditions()
+            if text not in self._codes:
+                with _locked(self.path / 'conditions.txt') as fd:
+                    size = os.fstat(fd).st_size
+                    existing = os.pread(fd, size, 0).decode('utf-8').split('\n')[:-1]
+                    if text not in existing:
+                        os.pwrite(fd, f"{text}\n".encode('utf-8'), size)
+                self._load_conditions()
+            return self._codes[text]
+    
+    def _condition_text(self, code: int) -> str:
+        with self._lock:
+            if code >= len(self._conditions):
+                self._load_conditions()
+            return self._conditions[code] if code < len(self._conditions) else ''
+    
+    def append(self, key: str, value: Union[CurrentObservation, ForecastSeries], now: Optional[float] = None):
+        """Record a fetched observation or forecast for a city."""
+        now = time.time() if now is None else now
+        self.path.mkdir(parents=True, exist_ok=True)
+        if isinstance(value, CurrentObservation):
+            row = (value.dt, _centi(value.temp), _centi(value.feels_like), _centi(value.wind_speed),
+                   int(value.pressure), int(value.wind_deg) % 360, self._condition_code(value.description),
+                   int(value.humidity))
+            # The same observation is often fetched more than once
+            self._append(key, 'obs', value, OBSERVATION.pack(*row), lambda last: value.dt > last[0], now)
+            return
+        
+        if not len(value):
+            return
+        codes = [self._condition_code(text) for text in value.conditions]
+        issued = int(now)
+        records = b''.join(
+            FORECAST.pack(issued, value.dt[i], _centi(value.temp[i]), _centi(value.feels_like[i]),
+                          _centi(value.wind_speed[i]), value.pressure[i], value.wind_deg[i] % 360,
+                          codes[value.condition[i]], value.humidity[i])
+            for i in range(len(value))
+        )
+        # A forecast is stored once per forecast window
+        last_slot = value.dt[-1]
+        self._append(key, 'fc', value, records, lambda last: last[1] != last_slot, now)
+    
+    def _append(self, key: str, kind: str, value, records: bytes, is_new, now: float):
+        """Append records unless is_new(last stored record) says they are already there."""
+        _, magic, record = KINDS[kind]
+        path = self._file(key, kind)
+        header = HEADER.pack(magic, value.timezone, value.country.encode('ascii', 'replace')[:2],
+                             value.city.encode('utf-8')[:48])
+        
+        with _locked(path) as fd:
+            size = os.fstat(fd).st_size
+            if size < HEADER.size or os.pread(fd, HEADER.size, 0) != header:
+                # New file, or the city's name or timezone changed
+                os.pwrite(fd, header, 0)
+                size = max(size, HEADER.size)
+            # Drop any torn record from an interrupted write
+            size -= (size - HEADER.size) % record.size
+            
+            if size > HEADER.size and not is_new(record.unpack(os.pread(fd, record.size, size - record.size))):
+                return
+            os.pwrite(fd, records, size)
+            os.ftruncate(fd, size + len(records))
+            
+            oldest = KEY.unpack(os.pread(fd, KEY.size, HEADER.size))[0]
+            cutoff = now - self.retention[kind]
+            if oldest < cutoff - COMPACT_SLACK:
+                self._compact_locked(path, fd, kind, cutoff)
+    
+    def _compact_locked(self, path: Path, fd: int, kind: str, cutoff: float) -> int:
+        """Rewrite a locked file without records older than cutoff, sorted and deduplicated."""
+        record = KINDS[kind][2]
+        size = os.fstat(fd).st_size
+        data = os.pread(fd, size, 0)
+        header, body = data[:HEADER.size], data[HEADER.size:]
+        body = body[:len(body) - len(body) % record.size]
+        
+        rows = [body[i:i + record.size] for i in range(0, len(body), record.size)]
+        kept = sorted(dict.fromkeys(row for row in rows if KEY.unpack_from(row)[0] >= cutoff),
+                      key=lambda row: KEY.unpack_from(row)[0])
+        if kept == rows:
+            return 0
+        
+        # Write to a temporary file and rename it into place, like the cache does
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(b''.join(kept))
+        os.replace(tmp_path, path)
+        return len(rows) - len(kept)
+    
+    def compact(self, key: Optional[str] = None, now: Optional[float] = None) -> Tuple[int, int]:
+        """Apply retention to one city's files, or all of them; returns (files, records removed)."""
+        now = time.time() if now is None else now
+        if key is not None:
+            paths = [self._file(key, kind) for kind in KINDS]
+        else:
+            paths = sorted(self.path.glob('*.obs')) + sorted(self.path.glob('*.fc')) if self.path.exists() else []
+        
+        files = removed = 0
+        for path in paths:
+            kind = 'obs' if path.suffix == '.obs' else 'fc'
+            if not path.exists():
+                continue
+            with _locked(path) as fd:
+                removed += self._compact_locked(path, fd, kind, now - self.retention[kind])
+            files += 1
+        return files, removed
+    
+    @contextmanager
+    def _mapped(self, key: str, kind: str) -> Iterator[Optional[mmap.mmap]]:
+        """Read-only map of a history file, or None if it holds no records."""
+        try:
+            f = open(self._file(key, kind), 'rb')
+        except FileNotFoundError:
+            yield None
+            return
+        with f:
+            if os.fstat(f.fileno()).st_size <= HEADER.size:
+                yield None
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped[:8] != KINDS[kind][1]:
+                    yield None
+                else:
+                    yield mapped
+    
+    @staticmethod
+    def _bisect(mapped: mmap.mmap, record: struct.Struct, count: int, value: float) -> int:
+        """Index of the first record whose key is >= value."""
+        low, high = 0, count
+        while low < high:
+            mid = (low + high) // 2
+            if KEY.unpack_from(mapped, HEADER.size + mid * record.size)[0] < value:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+    
+    def _decode(self, mapped: mmap.mmap, kind: str, start: int, stop: int) -> List[Sequence]:
+        """Columns of records start..stop (dt onwards), as NumPy arrays when it is installed."""
+        record = KINDS[kind][2]
+        data = mapped[HEADER.size + start * record.size:HEADER.size + stop * record.size]
+        skip = 1 if kind == 'fc' else 0  # Forecast records lead with the fetch time
+        np = _load_numpy()
+        if np is None:
+            return list(zip(*record.iter_unpack(data)))[skip:]
+        
+        names = [f"f{i}" for i in range(len(COLUMN_TYPES) + skip)]
+        formats = ['<i8'] * skip + ['<' + np.dtype(typecode).str[1:] for typecode in COLUMN_TYPES]
+        offsets = [8 * i for i in range(skip)]
+        offsets += [8 * skip + struct.calcsize('<' + COLUMN_TYPES[:i]) for i in range(len(COLUMN_TYPES))]
+        rows = np.frombuffer(data, np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                                             'itemsize': record.size}))
+        return [rows[name] for name in names[skip:]]
+    
+    def _series(self, key: str, mapped: mmap.mmap, columns: List[Sequence]) -> ForecastSeries:
+        """Decoded columns as a metric ForecastSeries."""
+        _, timezone, country, name = HEADER.unpack_from(mapped)
+        series = ForecastSeries(name.rstrip(b'\0').decode('utf-8', 'ignore'),
+                                country.rstrip(b'\0').decode('ascii', 'ignore'),
+                                int(key[1:]) if key.startswith('#') and key[1:].isdigit() else None, timezone)
+        if not columns:
+            return series
+        
+        dt, temp, feels_like, wind_speed, pressure, wind_deg, codes, humidity = columns
+        series.dt = _array('q', dt)
+        series.temp = _array('d', temp, 100)
+        series.feels_like = _array('d', feels_like, 100)
+        series.wind_speed = _array('d', wind_speed, 100)
+        series.pressure = _array('H', pressure)
+        series.wind_deg = _array('H', wind_deg)
+        series.humidity = _array('B', humidity)
+        
+        # Shared condition codes become the series' own small index, in order of first use
+        local: Dict[int, int] = {}
+        for code in (codes.tolist() if hasattr(codes, 'tolist') else codes):
+            if code not in local:
+                local[code] = len(series.conditions)
+                series.conditions.append(self._condition_text(code))
+        if hasattr(codes, 'tolist'):
+            table = _load_numpy().zeros(max(local) + 1, dtype='B')
+            table[list(local)] = list(local.values())
+            series.condition = _array('B', table[codes])
+        else:
+            series.condition = array('B', [local[code] for code in codes])
+        return series
+    
+    def observations(self, key: str, since: float, until: Optional[float] = None) -> Optional[ForecastSeries]:
+        """Recorded observations of a city between since and until, as a series; None if there are none."""
+        with self._mapped(key, 'obs') as mapped:
+            if mapped is None:
+                return None
+            count = (len(mapped) - HEADER.size) // OBSERVATION.size
+            start = self._bisect(mapped, OBSERVATION, count, since)
+            stop = count if until is None else self._bisect(mapped, OBSERVATION, count, until + 1)
+            if start >= stop:
+                return None
+            return self._series(key, mapped, self._decode(mapped, 'obs', start, stop))
+    
+    def forecasts(self, key: str, since: float, until: Optional[float] = None) -> List[Tuple[int, ForecastSeries]]:
+        """Forecasts of a city fetched between since and until, as (fetch time, series) pairs."""
+        with self._mapped(key, 'fc') as mapped:
+            if mapped is None:
+                return []
+            count = (len(mapped) - HEADER.size) // FORECAST.size
+            start = self._bisect(mapped, FORECAST, count, since)
+            stop = count if until is None else self._bisect(mapped, FORECAST, count, until + 1)
+            
+            results = []
+            while start < stop:
+                issued = KEY.unpack_from(mapped, HEADER.size + start * FORECAST.size)[0]
+                end = min(self._bisect(mapped, FORECAST, count, issued + 1), stop)
+                results.append((issued, self._series(key, mapped, self._decode(mapped, 'fc', start, end))))
+                start = end
+            return results
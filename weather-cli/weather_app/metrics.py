@@ -0,0 +1,106 @@
+"""Lightweight per-stage timers and counters.
+
+Components record into the process-wide `metrics` registry:
+
+    with metrics.timer('network'):
+        ...
+    metrics.incr('cache.hits')
+
+The CLI prints the collected numbers with --timings and can append them
+as JSON lines to a file (--metrics-file / WEATHER_METRICS_FILE).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+class Metrics:
+    """Thread-safe registry of stage timings and counters."""
+    
+    def __init__(self):
+        self._timings: Dict[str, list] = {}  # stage -> [calls, total seconds]
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def add_time(self, stage: str, seconds: float):
+        """Record one call of `stage` that took `seconds`."""
+        with self._lock:
+            timing = self._timings.setdefault(stage, [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+    
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one call of `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+    
+    def incr(self, name: str, value: float = 1):
+        """Add `value` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the current numbers, with times in milliseconds."""
+        with self._lock:
+            return {
+                'timings': {
+                    stage: {'calls': calls, 'total_ms': round(total * 1000, 3)}
+                    for stage, (calls, total) in sorted(self._timings.items())
+                },
+                'counters': dict(sorted(self._counters.items()))
+            }
+    
+    def reset(self):
+        """Drop everything recorded so far."""
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+# Process-wide registry
+metrics = Metrics()
+
+def timed(stage: str) -> Callable:
+    """Decorator recording each call of the function under `stage`."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def format_report(snapshot: Dict[str, Any], wall_ms: float) -> str:
+    """Plain-text breakdown of a snapshot for --timings."""
+    lines = [f"{'stage':<24}{'calls':>7}{'total ms':>12}"]
+    for stage, timing in snapshot['timings'].items():
+        lines.append(f"{stage:<24}{timing['calls']:>7}{timing['total_ms']:>12.2f}")
+    lines.append(f"{'wall':<24}{'':>7}{wall_ms:>12.2f}")
+    
+    if snapshot['counters']:
+        lines.append("")
+        lines.append(f"{'counter':<24}{'value':>19}")
+        for name, value in snapshot['counters'].items():
+            value = f"{value:.3f}" if isinstance(value, float) else str(value)
+            lines.append(f"{name:<24}{value:>19}")
+    return '\n'.join(lines)
+
+def append_metrics(path: str, record: Dict[str, Any]):
+    """Append one JSON line with host and timestamp to `path`."""
+    import socket
+    
+    record = dict(record, timestamp=time.time(), host=socket.gethostname(), pid=os.getpid())
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    
+    # A single O_APPEND write keeps concurrent writers' lines intact
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
@@ -0,0 +1,229 @@
+"""Compact weather models parsed once from OpenWeatherMap payloads.
+
+The raw API JSON is parsed into these classes in WeatherAPI, cached in their
+compact form and consumed directly by WeatherDisplay. Forecasts are stored
+column-wise in typed arrays rather than as a list of nested dicts.
+"""
+from array import array
+from typing import Dict, Any, List, Optional
+from .units import CANONICAL_UNITS, MPS_TO_MPH, SLOTS_PER_DAY, celsius_to_fahrenheit
+
+class CurrentObservation:
+    """Current conditions for one city.
+    
+    `stale_age` is None for fresh data. For last-known data served because
+    fresh data could not be fetched, it is the seconds since it was fetched.
+    """
+    
+    # Fields of the cached form
+    FIELDS = ('city', 'country', 'city_id', 'dt', 'timezone', 'description',
+              'temp', 'feels_like', 'humidity', 'pressure', 'wind_speed', 'wind_deg', 'units')
+    __slots__ = FIELDS + ('stale_age',)
+    
+    def __init__(self, city: str, country: str, city_id: Optional[int], dt: int, timezone: int,
+                 description: str, temp: float, feels_like: float, humidity: int, pressure: float,
+                 wind_speed: float, wind_deg: float, units: str = CANONICAL_UNITS):
+        self.city = city
+        self.country = country
+        self.city_id = city_id
+        self.dt = dt
+        self.timezone = timezone
+        self.description = description
+        self.temp = temp
+        self.feels_like = feels_like
+        self.humidity = humidity
+        self.pressure = pressure
+        self.wind_speed = wind_speed
+        self.wind_deg = wind_deg
+        self.units = units
+        self.stale_age: Optional[float] = None
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'CurrentObservation':
+        """Parse a metric `weather` endpoint payload (or one item of a `group` payload)."""
+        main = data['main']
+        wind = data.get('wind', {})
+        sys = data.get('sys', {})
+        return cls(
+            city=data['name'],
+            country=sys.get('country', ''),
+            city_id=data.get('id'),
+            dt=data.get('dt', 0),
+            timezone=data.get('timezone', sys.get('timezone', 0)),  # Group items carry it in `sys`
+            description=data['weather'][0]['description'],
+            temp=main['temp'],
+            feels_like=main.get('feels_like', main['temp']),
+            humidity=main.get('humidity', 0),
+            pressure=main.get('pressure', 0),
+            wind_speed=wind.get('speed', 0),
+            wind_deg=wind.get('deg', 0)
+        )
+    
+    def to_cache(self) -> List[Any]:
+        """Compact positional form used for caching and the daemon protocol."""
+        return [getattr(self, name) for name in self.FIELDS]
+    
+    @classmethod
+    def from_cache(cls, row: List[Any]) -> 'CurrentObservation':
+        """Inverse of to_cache."""
+        if not isinstance(row, list) or len(row) != len(cls.FIELDS):
+            raise ValueError("Not a cached CurrentObservation")
+        return cls(*row)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of all fields."""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def convert(self, units: str) -> 'CurrentObservation':
+        """Return this observation in the requested units."""
+        if units == self.units:
+            return self
+        if self.units != CANONICAL_UNITS or units != 'imperial':
+            raise ValueError(f"Cannot convert {self.units} to {units}")
+        
+        converted = CurrentObservation.from_cache(self.to_cache())
+        converted.temp = celsius_to_fahrenheit(self.temp)
+        converted.feels_like = celsius_to_fahrenheit(self.feels_like)
+        converted.wind_speed = self.wind_speed * MPS_TO_MPH
+        converted.units = units
+        converted.stale_age = self.stale_age
+        return converted
+
+class ForecastSeries:
+    """3-hourly forecast for one city, stored as typed columns.
+    
+    Slot i is described by dt[i], temp[i], ... and the condition text
+    conditions[condition[i]]. `stale_age` is as for CurrentObservation.
+    """
+    
+    __slots__ = ('city', 'country', 'city_id', 'timezone', 'units', 'dt', 'temp', 'feels_like',
+                 'humidity', 'pressure', 'wind_speed', 'wind_deg', 'condition', 'conditions', 'stale_age')
+    
+    # Array typecode per column
+    COLUMNS = {
+        'dt': 'q',
+        'temp': 'd',
+        'feels_like': 'd',
+        'humidity': 'B',
+        'pressure': 'H',
+        'wind_speed': 'd',
+        'wind_deg': 'H',
+        'condition': 'B'
+    }
+    
+    def __init__(self, city: str, country: str, city_id: Optional[int] = None, timezone: int = 0,
+                 units: str = CANONICAL_UNITS):
+        self.city = city
+        self.country = country
+        self.city_id = city_id
+        self.timezone = timezone
+        self.units = units
+        for name, typecode in self.COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self.conditions: List[str] = []
+        self.stale_age: Optional[float] = None
+    
+    def __len__(self) -> int:
+        return len(self.dt)
+    
+    def description(self, i: int) -> str:
+        """Condition text of slot i."""
+        return self.conditions[self.condition[i]]
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'ForecastSeries':
+        """Parse a metric `forecast` endpoint payload."""
+        city = data['city']
+        series = cls(city['name'], city.get('country', ''), city.get('id'), city.get('timezone', 0))
+        index = {}
+        for item in data['list']:
+            main = item['main']
+            wind = item.get('wind', {})
+            description = item['weather'][0]['description']
+            if description not in index:
+                index[description] = len(series.conditions)
+                series.conditions.append(description)
+            
+            series.dt.append(item['dt'])
+            series.temp.append(main['temp'])
+            series.feels_like.append(main.get('feels_like', main['temp']))
+            series.humidity.append(int(main.get('humidity', 0)))
+            series.pressure.append(int(main.get('pressure', 0)))
+            series.wind_speed.append(wind.get('speed', 0))
+            series.wind_deg.append(int(wind.get('deg', 0)))
+            series.condition.append(index[description])
+        return series
+    
+    def to_cache(self) -> Dict[str, Any]:
+        """Compact column form used for caching and the daemon protocol."""
+        cached = {
+            'city': self.city,
+            'country': self.country,
+            'city_id': self.city_id,
+            'timezone': self.timezone,
+            'units': self.units,
+            'conditions': self.conditions
+        }
+        for name in self.COLUMNS:
+            cached[name] = getattr(self, name).tolist()
+        return cached
+    
+    @classmethod
+    def from_cache(cls, cached: Dict[str, Any]) -> 'ForecastSeries':
+        """Inverse of to_cache."""
+        if not isinstance(cached, dict) or 'conditions' not in cached:
+            raise ValueError("Not a cached ForecastSeries")
+        series = cls(cached['city'], cached['country'], cached['city_id'], cached['timezone'], cached['units'])
+        series.conditions = list(cached['conditions'])
+        for name, typecode in cls.COLUMNS.items():
+            setattr(series, name, array(typecode, cached[name]))
+        return series
+    
+    def _copy(self, stop: Optional[int] = None) -> 'ForecastSeries':
+        series = ForecastSeries(self.city, self.country, self.city_id, self.timezone, self.units)
+        series.conditions = self.conditions
+        series.stale_age = self.stale_age
+        for name in self.COLUMNS:
+            setattr(series, name, getattr(self, name)[:stop])
+        return series
+    
+    def head(self, days: int) -> 'ForecastSeries':
+        """The first `days` days of slots."""
+        if days * SLOTS_PER_DAY >= len(self):
+            return self
+        return self._copy(days * SLOTS_PER_DAY)
+    
+    def convert(self, units: str) -> 'ForecastSeries':
+        """Return this forecast in the requested units."""
+        if units == self.units:
+            return self
+        if self.units != CANONICAL_UNITS or units != 'imperial':
+            raise ValueError(f"Cannot convert {self.units} to {units}")
+        
+        converted = self._copy()
+        converted.temp = array('d', (celsius_to_fahrenheit(t) for t in self.temp))
+        converted.feels_like = array('d', (celsius_to_fahrenheit(t) for t in self.feels_like))
+        converted.wind_speed = array('d', (s * MPS_TO_MPH for s in self.wind_speed))
+        converted.units = units
+        return converted
+    
+    def observation_at(self, now: float) -> CurrentObservation:
+        """Current-conditions view of the slot closest to `now`."""
+        i = min(range(len(self)), key=lambda j: abs(self.dt[j] - now))
+        observation = CurrentObservation(
+            city=self.city,
+            country=self.country,
+            city_id=self.city_id,
+            dt=self.dt[i],
+            timezone=self.timezone,
+            description=self.description(i),
+            temp=self.temp[i],
+            feels_like=self.feels_like[i],
+            humidity=self.humidity[i],
+            pressure=self.pressure[i],
+            wind_speed=self.wind_speed[i],
+            wind_deg=self.wind_deg[i],
+            units=self.units
+        )
+        observation.stale_age = self.stale_age
+        return observation
@@ -0,0 +1,118 @@
+"""Machine-readable output (JSON, NDJSON, CSV) for piping into other tools.
+
+Writers emit one record per city as soon as it is available and keep
+nothing in memory between records. This module must not import Rich.
+"""
+import csv
+import json
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+from .aggregate import aggregate
+from .models import CurrentObservation
+
+def current_record(data: CurrentObservation) -> Dict[str, Any]:
+    """Record for a current-weather result."""
+    return data.to_dict()
+
+def forecast_record(data, days: int) -> Dict[str, Any]:
+    """Record for a forecast result, summarized per day."""
+    return {
+        'city': data.city,
+        'country': data.country,
+        'city_id': data.city_id,
+        'timezone': data.timezone,
+        'units': data.units,
+        'stale_age': data.stale_age,
+        'days': [summary.to_dict() for summary in aggregate(data, limit=days)]
+    }
+
+def error_record(city: str, error: Exception) -> Dict[str, Any]:
+    """Record for a city that failed."""
+    return {'city': city, 'error': str(error), 'type': type(error).__name__}
+
+class OutputWriter:
+    """Write (city, data, error) results as records to a text stream."""
+    
+    def __init__(self, stream: TextIO, forecast: Optional[int] = None):
+        self.stream = stream
+        self.forecast = forecast
+    
+    def records(self, city: str, data: Any, error: Optional[Exception]) -> Iterator[Dict[str, Any]]:
+        """Records for one result."""
+        if error is not None:
+            yield error_record(city, error)
+        elif self.forecast:
+            yield forecast_record(data, self.forecast)
+        else:
+            yield current_record(data)
+    
+    def write(self, city: str, data: Any, error: Optional[Exception] = None):
+        """Write one result and flush it to the stream."""
+        for record in self.records(city, data, error):
+            self._write_record(record)
+        self.stream.flush()
+    
+    def _write_record(self, record: Dict[str, Any]):
+        raise NotImplementedError
+    
+    def close(self):
+        """Finish the output."""
+        self.stream.flush()
+
+class NDJSONWriter(OutputWriter):
+    """One JSON object per line."""
+    
+    def _write_record(self, record: Dict[str, Any]):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+class JSONWriter(OutputWriter):
+    """A single JSON array, written incrementally."""
+    
+    def __init__(self, stream: TextIO, forecast: Optional[int] = None):
+        super().__init__(stream, forecast)
+        self._count = 0
+    
+    def _write_record(self, record: Dict[str, Any]):
+        self.stream.write(('[\n' if not self._count else ',\n') + json.dumps(record, ensure_ascii=False))
+        self._count += 1
+    
+    def close(self):
+        """Close the array."""
+        self.stream.write('\n]\n' if self._count else '[]\n')
+        super().close()
+
+class CSVWriter(OutputWriter):
+    """Comma-separated rows with a header; forecasts get one row per day."""
+    
+    CURRENT_FIELDS = list(CurrentObservation.__slots__) + ['error']
+    FORECAST_FIELDS = ['city', 'country', 'city_id', 'date', 'temp_min', 'temp_max', 'temp_mean',
+                       'humidity_mean', 'wind_mean', 'condition', 'units', 'stale_age', 'error']
+    
+    def __init__(self, stream: TextIO, forecast: Optional[int] = None):
+        super().__init__(stream, forecast)
+        self.fields: List[str] = self.FORECAST_FIELDS if forecast else self.CURRENT_FIELDS
+        self._writer = csv.DictWriter(stream, self.fields, extrasaction='ignore')
+        self._writer.writeheader()
+    
+    def records(self, city: str, data: Any, error: Optional[Exception]) -> Iterator[Dict[str, Any]]:
+        """Flatten forecasts into one row per day."""
+        if error is not None or not self.forecast:
+            yield from super().records(city, data, error)
+            return
+        
+        record = forecast_record(data, self.forecast)
+        days = record.pop('days')
+        for day in days:
+            yield dict(record, **day)
+    
+    def _write_record(self, record: Dict[str, Any]):
+        self._writer.writerow(record)
+
+WRITERS = {
+    'json': JSONWriter,
+    'ndjson': NDJSONWriter,
+    'csv': CSVWriter
+}
+
+def create_writer(output_format: str, stream: TextIO, forecast: Optional[int] = None) -> OutputWriter:
+    """Create the writer for an output format."""
+    return WRITERS[output_format](stream, forecast)
@@ -0,0 +1,88 @@
+"""Retry backoff and circuit breaker helpers for upstream requests."""
+import random
+import threading
+import time
+from typing import Optional
+from .errors import CircuitOpenError
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff delay for a zero-based retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def retry_after_delay(value: Optional[str], cap: float) -> Optional[float]:
+    """Parse a Retry-After header given in seconds, capped to `cap`."""
+    if not value:
+        return None
+    try:
+        return max(0.0, min(cap, float(value)))
+    except ValueError:
+        return None
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker that fails fast while the upstream is down.
+    
+    After `failure_threshold` consecutive failures the circuit opens and every
+    call is rejected for `reset_timeout` seconds. The first call after that is
+    let through as a trial (half-open); success closes the circuit, failure
+    opens it again.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """Current breaker state."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go upstream."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if self._state == self.OPEN and remaining > 0:
+                raise CircuitOpenError(
+                    f"Weather service is unavailable; retrying in {remaining:.0f}s."
+                )
+            
+            # Reset timeout elapsed: allow a single trial request
+            if self._trial_in_flight:
+                raise CircuitOpenError("Weather service is unavailable; a recovery check is in progress.")
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+    
+    def record_success(self):
+        """Record a successful upstream call."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+    
+    def abandon(self):
+        """Forget a call that ended without an outcome, e.g. because it was cancelled."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Record a failed upstream call."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,193 @@
+"""Client-side rate limiting, request coalescing and batching."""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+class TokenBucket:
+    """Thread-safe token bucket that queues callers instead of rejecting them.
+    
+    Tokens refill at `rate` per second up to `burst`. A caller that finds the
+    bucket empty reserves the next token and sleeps until it is due, so
+    waiting callers are served in arrival order.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Take one token without waiting; returns seconds until it may be used.
+        
+        With max_wait, no token is taken and None is returned if it would
+        not be due within max_wait seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+    
+    def acquire(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Take one token, blocking until available; returns seconds waited.
+        
+        With max_wait, returns None at once instead if the token would not
+        be due within max_wait seconds.
+        """
+        wait = self.reserve(max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class _Call:
+    """An in-flight call shared by SingleFlight waiters."""
+    
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution."""
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per key at a time; returns (result, shared).
+        
+        Callers arriving while a call for the same key is in flight wait for
+        it and get its result (or exception) with shared=True.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+def chain(future: Future, fn: Callable[[Future], Any]) -> Future:
+    """Future for fn(future), called once future is done."""
+    chained = Future()
+    
+    def done(_):
+        try:
+            chained.set_result(fn(future))
+        except Exception as e:
+            chained.set_exception(e)
+    
+    future.add_done_callback(done)
+    return chained
+
+class Batcher:
+    """Collect concurrent calls into batches executed with one call of `run`.
+    
+    `run(keys)` receives up to `max_size` keys and returns a mapping of key
+    to result or Exception. A batch is sent once it is full or `window`
+    seconds after its first key arrived, whichever comes first. Callers
+    submitting a key that is already waiting in the batch share its result.
+    """
+    
+    def __init__(self, run: Callable[[List[Hashable]], Mapping[Hashable, Any]], max_size: int, window: float):
+        self.run = run
+        self.max_size = max(1, max_size)
+        self.window = window
+        self._pending: Dict[Hashable, Future] = {}
+        self._cond = threading.Condition()
+    
+    def submit(self, key: Hashable) -> Any:
+        """Add key to the current batch and block until its result is ready."""
+        return self._add(key, wait=True).result()
+    
+    def submit_async(self, key: Hashable) -> Future:
+        """Add key to the current batch without waiting for it; returns a future for its result.
+        
+        The caller that fills a batch still sends it before returning.
+        """
+        return self._add(key, wait=False)
+    
+    def _add(self, key: Hashable, wait: bool) -> Future:
+        batch = None
+        with self._cond:
+            pending = self._pending
+            call = pending.get(key)
+            if call is None:
+                call = pending[key] = Future()
+                if len(pending) >= self.max_size:
+                    # Full: this caller sends it; a waiting first caller stands down
+                    batch = pending
+                    self._pending = {}
+                    self._cond.notify_all()
+                elif len(pending) == 1 and not wait:
+                    # Nobody waits out the window, so a timer sends the batch if it doesn't fill
+                    timer = threading.Timer(self.window, self._send_late, (pending,))
+                    timer.daemon = True
+                    timer.start()
+                elif len(pending) == 1:
+                    # First caller waits out the window, unless the batch fills first
+                    deadline = time.monotonic() + self.window
+                    while self._pending is pending:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            batch = pending
+                            self._pending = {}
+                            break
+                        self._cond.wait(remaining)
+        
+        if batch is not None:
+            self._execute(batch)
+        return call
+    
+    def _send_late(self, pending: Dict[Hashable, Future]):
+        """Send a batch whose window has passed, unless it was sent already."""
+        with self._cond:
+            if self._pending is not pending:
+                return
+            self._pending = {}
+        self._execute(pending)
+    
+    def _execute(self, batch: Dict[Hashable, Future]):
+        try:
+            results = self.run(list(batch))
+        except BaseException as e:
+            # Every caller in the batch gets the error, including this one
+            for call in batch.values():
+                call.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        
+        for key, call in batch.items():
+            result = results.get(key)
+            if result is None:
+                call.set_exception(LookupError(f"No result for {key!r}"))
+            elif isinstance(result, Exception):
+                call.set_exception(result)
+            else:
+                call.set_result(result)
@@ -0,0 +1,15 @@
+"""Unit conversion helpers.
+
+Data is fetched and cached once in metric units; imperial values and
+shorter forecasts are derived locally (see models) so they never cost an
+API call.
+"""
+
+CANONICAL_UNITS = 'metric'
+
+MPS_TO_MPH = 2.2369362920544
+SLOTS_PER_DAY = 8  # Forecast comes in 3-hour intervals
+
+def celsius_to_fahrenheit(temp: float) -> float:
+    """Convert Celsius to Fahrenheit."""
+    return temp * 9 / 5 + 32
@@ -0,0 +1,149 @@
+"""Cache warming and refresh-ahead for a fixed set of cities.
+
+CacheWarmer keeps the current weather and forecast of each city in the
+cache, refreshing every entry shortly before it expires so that
+interactive queries for those cities are always cache hits. Refresh times
+get a random extra lead so that entries written together don't all expire
+(and refetch) together, and upstream calls are paced by a request budget.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+from .config import Config
+from .metrics import metrics
+from .throttle import TokenBucket
+
+# (kind, city) with kind 'current' or 'forecast'
+Item = Tuple[str, str]
+
+class CacheWarmer:
+    """Prefetch and refresh-ahead scheduler for a set of cities."""
+    
+    KINDS = ('current', 'forecast')
+    RETRY_DELAY = 60  # Seconds before retrying a failed refresh
+    MIN_INTERVAL = 10  # Never refresh an item more often than this
+    
+    def __init__(self, api, cities: Iterable[str], budget: Optional[float] = None,
+                 lead: Optional[float] = None, spread: Optional[float] = None):
+        self.api = api
+        self.cities = list(dict.fromkeys(cities))
+        budget = budget if budget is not None else Config.WARM_BUDGET
+        # Allow ten seconds' worth of calls back-to-back
+        self.budget = TokenBucket(budget / 60, max(1, int(budget / 6)))
+        self.lead = lead if lead is not None else Config.REFRESH_AHEAD
+        self.spread = spread if spread is not None else Config.REFRESH_SPREAD
+        self.stats = {'refreshed': 0, 'failed': 0, 'calls': 0}
+        self._random = random.Random()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(Config.GROUP_SIZE, 4),
+                                            thread_name_prefix='weather-warm')
+    
+    @property
+    def items(self) -> List[Item]:
+        """Every (kind, city) pair kept warm."""
+        return [(kind, city) for city in self.cities for kind in self.KINDS]
+    
+    def due_at(self, item: Item) -> float:
+        """When an item should next be refreshed: a jittered lead before its cache entry expires."""
+        kind, city = item
+        expires = self.api.cache.expires_at(self.api.cache_key(kind, city))
+        if expires is None:
+            return 0.0
+        return expires - self.lead - self._random.uniform(0, self.spread)
+    
+    def _spend(self):
+        """Wait for one upstream call from the budget."""
+        self.budget.acquire()
+        self.stats['calls'] += 1
+    
+    def refresh(self, items: List[Item]) -> List[Tuple[str, str, Optional[Exception]]]:
+        """Refresh items within the request budget; returns (kind, city, error) per item."""
+        grouped: Dict[int, List[str]] = {}  # city ID -> names for it
+        single = []
+        for kind, city in items:
+            if kind == 'current' and self.api.can_group(city):
+                grouped.setdefault(self.api.resolve_city(city)[1]['id'], []).append(city)
+            else:
+                single.append((kind, city))
+        
+        futures = {}
+        # Each chunk is sent as one `group` call, so one budget unit is one upstream request
+        ids = list(grouped)
+        size = max(1, Config.GROUP_SIZE)
+        for start in range(0, len(ids), size):
+            chunk = ids[start:start + size]
+            self._spend()
+            futures[self._executor.submit(self.api.refresh_group, chunk)] = chunk
+        for kind, city in single:
+            self._spend()
+            futures[self._executor.submit(self.api.refresh, kind, city)] = (kind, city)
+        
+        results = []
+        for future in as_completed(futures):
+            error = future.exception()
+            if isinstance(futures[future], tuple):
+                kind, city = futures[future]
+                results.append(self._result(kind, city, error))
+                continue
+            for city_id in futures[future]:
+                city_error = error if error is not None else future.result().get(city_id)
+                if not isinstance(city_error, Exception):
+                    city_error = None
+                for city in grouped[city_id]:
+                    results.append(self._result('current', city, city_error))
+        return results
+    
+    def _result(self, kind: str, city: str, error: Optional[Exception]) -> Tuple[str, str, Optional[Exception]]:
+        """Count one refreshed or failed item."""
+        if error is None:
+            self.stats['refreshed'] += 1
+            metrics.incr('warm.refreshed')
+        else:
+            self.stats['failed'] += 1
+            metrics.incr('warm.failed')
+        return kind, city, error
+    
+    def warm(self) -> List[Tuple[str, str, Optional[Exception]]]:
+        """Fetch every item that is missing or due for refresh now."""
+        now = time.time()
+        return self.refresh([item for item in self.items if self.due_at(item) <= now])
+    
+    def run(self, on_round=None):
+        """Refresh items ahead of expiry until stop() is called.
+        
+        on_round(results) is called after each round of refreshes.
+        """
+        schedule: Dict[Item, float] = {item: self.due_at(item) for item in self.items}
+        while not self._stop.is_set():
+            now = time.time()
+            due = [item for item, at in schedule.items() if at <= now]
+            if any(kind == 'current' and self.api.can_group(city) for kind, city in due):
+                # Fill the group call with current weather coming due within the lead anyway
+                due += [(kind, city) for (kind, city), at in schedule.items()
+                        if now < at <= now + self.lead and kind == 'current' and self.api.can_group(city)]
+            if due:
+                results = self.refresh(due)
+                for kind, city, error in results:
+                    if error is None:
+                        schedule[(kind, city)] = max(self.due_at((kind, city)), time.time() + self.MIN_INTERVAL)
+                    else:
+                        schedule[(kind, city)] = time.time() + self.RETRY_DELAY
+                if on_round is not None:
+                    on_round(results)
+            
+            if schedule:
+                wait = min(schedule.values()) - time.time()
+            else:
+                wait = self.RETRY_DELAY
+            self._stop.wait(min(max(wait, 0.5), self.RETRY_DELAY))
+    
+    def stop(self):
+        """Stop run() after the current round."""
+        self._stop.set()
+    
+    def close(self):
+        """Stop and release worker threads."""
+        self.stop()
+        self._executor.shutdown(wait=False)